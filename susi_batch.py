@@ -0,0 +1,194 @@
+"""
+SuSi Batch Mode
+---------------
+Renders the SuSi plots without a GUI, e.g. from cron on a headless machine:
+
+    python SuSi_analysis_tool.py batch --inputs data/ --out report.png
+
+Inputs may be files, directories (all *.txt files inside) or glob patterns.
+Instead, the files can be selected by a query against the archive index
+(see susi_index), e.g. --index susi.sqlite --query-metric Efficiency=20,100,
+or taken from a packed campaign (see susi_campaign) with --campaign, where
+only the selected files are read.
+A single input file gives the per-pixel plot, several files the comparison
+plot. Only the Agg canvas is used; tkinter is never imported.
+"""
+
+import argparse
+import glob
+import os
+import sys
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from susi_parser import default_workers
+from susi_cache import DEFAULT_CACHE_DIR
+from susi_engine import (default_filter_options, load_measurements, prepare_multiple_plot_data, summary_table,
+                         iv_parameter_table, diode_fit_table, MeasurementStore)
+from susi_plotting import default_plot_options, create_figure, plot_single, plot_multiple
+from susi_index import connect as connect_index, find_files, parse_header_condition
+from susi_campaign import Campaign
+
+
+def collect_input_files(inputs):
+    file_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            file_paths.extend(sorted(glob.glob(os.path.join(item, "*.txt"))))
+        else:
+            file_paths.extend(sorted(glob.glob(item)) or [item])
+    return file_paths
+
+
+def parse_filter(text):
+    # "Efficiency=5,25" -> ("Efficiency", (5.0, 25.0))
+    name, sep, bounds = text.partition("=")
+    parts = bounds.split(",")
+    if not sep or len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"Invalid filter '{text}', expected NAME=MIN,MAX")
+    return name.strip(), (float(parts[0]), float(parts[1]))
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="SuSi_analysis_tool.py batch",
+                                     description="Render SuSi plots without the GUI.")
+    parser.add_argument("--inputs", nargs="+", default=[],
+                        help="measurement files, directories or glob patterns")
+    parser.add_argument("--index", default=None,
+                        help="select the files by a query against this archive index instead of --inputs")
+    parser.add_argument("--campaign", default=None,
+                        help="plot files of this packed campaign instead of --inputs (selected by --query-filename)")
+    parser.add_argument("--query-filename", default=None,
+                        help="file name glob for --index or --campaign, e.g. dev_*")
+    parser.add_argument("--query-device", default=None, help="device name glob for --index")
+    parser.add_argument("--query-from", default=None, help="earliest measurement date for --index (YYYY-MM-DD)")
+    parser.add_argument("--query-until", default=None, help="latest measurement date for --index (YYYY-MM-DD)")
+    parser.add_argument("--query-header", action="append", default=[], metavar="KEY=VALUE|KEY=MIN,MAX",
+                        help="header condition for --index (may be repeated)")
+    parser.add_argument("--query-metric", action="append", default=[], type=parse_filter, metavar="NAME=MIN,MAX",
+                        help="a pixel sweep of the file must lie in this range, for --index (may be repeated)")
+    parser.add_argument("--out", required=True, help="output image (format from the extension)")
+    parser.add_argument("--title", default=None, help="plot title (default: Comparison Plot)")
+    parser.add_argument("--labels", default="", help="comma-separated labels, one per file")
+    parser.add_argument("--separate", action="store_true", help="separate forward and reverse data")
+    parser.add_argument("--hysteresis", action="store_true", help="add the hysteresis index panel")
+    parser.add_argument("--filter", action="append", default=[], type=parse_filter, metavar="NAME=MIN,MAX",
+                        help="filter range, e.g. Efficiency=5,25 (may be repeated)")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="parser processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="parse cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the files")
+    parser.add_argument("--float32", action="store_true",
+                        help="keep the I-V data in single precision, half the memory for many files")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--stats", default=None, help="also write summary statistics to this CSV file")
+    parser.add_argument("--iv-params", default=None,
+                        help="also write Jsc, Voc, Pmax, Vmpp, Jmpp, FF and efficiency computed from every "
+                             "I-V curve to this CSV file")
+    parser.add_argument("--light-intensity", type=float, default=100.0,
+                        help="incident power in mW/cm² for --iv-params (default 100)")
+    parser.add_argument("--area", type=float, default=None,
+                        help="active area in cm² for --iv-params (default: the area in each file header)")
+    parser.add_argument("--diode-fit", default=None,
+                        help="also fit the single-diode model (Iph, I0, n, Rs, Rsh) to every I-V curve and write "
+                             "the parameters to this CSV file")
+    parser.add_argument("--temperature", type=float, default=298.15,
+                        help="cell temperature in K for --diode-fit (default 298.15)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    campaign = None
+    if args.campaign:
+        try:
+            campaign = Campaign(args.campaign)
+        except (OSError, ValueError) as e:
+            print(f"Could not open campaign {args.campaign}: {e}", file=sys.stderr)
+            return 1
+        file_ids = campaign.select(args.query_filename)
+        print(f"{len(file_ids)} of {campaign.n_files} campaign files selected.")
+        file_paths = [campaign.filenames[i] for i in file_ids]
+    elif args.index:
+        try:
+            header = [parse_header_condition(text) for text in args.query_header]
+            connection = connect_index(args.index)
+            try:
+                file_paths = find_files(connection, filename=args.query_filename, device=args.query_device,
+                                        date_range=(args.query_from, args.query_until), header=header,
+                                        metrics=dict(args.query_metric))
+            finally:
+                connection.close()
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{len(file_paths)} files match the query.")
+    elif args.inputs:
+        file_paths = collect_input_files(args.inputs)
+    else:
+        parser.error("one of --inputs, --index or --campaign is required")
+    if not file_paths:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    if campaign is not None:
+        # Plots and exports read the store, so no tables are rebuilt
+        multi_data, errors = campaign.measurements(file_ids, tables=False), []
+    else:
+        multi_data, errors = load_measurements(file_paths, max_workers=args.workers, cache_dir=cache_dir,
+                                               iv_dtype="float32" if args.float32 else None)
+    for file_path, error in errors:
+        print(f"Failed to load {file_path}: {error}", file=sys.stderr)
+    for entry in multi_data:
+        print(f"Loaded file: {entry['filename']}")
+    if not multi_data:
+        print("No measurement data loaded.", file=sys.stderr)
+        return 1
+
+    plot_options = default_plot_options()
+    plot_options["separate_forward_reverse"] = args.separate
+    plot_options["show_hysteresis"] = args.hysteresis
+    filter_options = default_filter_options()
+    for name, bounds in args.filter:
+        if name not in filter_options:
+            print(f"Unknown filter '{name}', choose from: {', '.join(filter_options)}", file=sys.stderr)
+            return 1
+        filter_options[name] = bounds
+
+    if args.labels:
+        labels = [lab.strip() for lab in args.labels.split(",")]
+        if len(labels) != len(multi_data):
+            print("Number of labels must match number of files!", file=sys.stderr)
+            return 1
+    else:
+        labels = [d["filename"] for d in multi_data]
+
+    store = campaign.store(file_ids, multi_data) if campaign is not None else MeasurementStore(multi_data)
+    store.drop_tables()
+    fig, axes = create_figure(plot_options)
+    FigureCanvasAgg(fig)
+    prepared = None
+    if len(multi_data) == 1:
+        plot_single(fig, axes, multi_data[0], plot_options, filter_options, args.separate, store)
+        if args.title:
+            fig.suptitle(args.title, fontsize=16, y=0.98)
+    else:
+        prepared = prepare_multiple_plot_data(store, filter_options)
+        plot_multiple(fig, axes, labels, prepared, plot_options, args.separate, args.title or "Comparison Plot")
+    if args.stats:
+        if prepared is None:
+            prepared = prepare_multiple_plot_data(store, filter_options)
+        summary_table(labels, prepared).to_csv(args.stats, index=False)
+        print(f"Statistics saved as: {args.stats}")
+    if args.iv_params:
+        iv_parameter_table(store, args.light_intensity, args.area).to_csv(args.iv_params, index=False)
+        print(f"I-V parameters saved as: {args.iv_params}")
+    if args.diode_fit:
+        diode_fit_table(store, args.temperature, args.workers).to_csv(args.diode_fit, index=False)
+        print(f"Diode fit saved as: {args.diode_fit}")
+    fig.savefig(args.out, dpi=args.dpi, bbox_inches="tight")
+    print(f"Plots saved as: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
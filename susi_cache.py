@@ -0,0 +1,102 @@
+"""
+SuSi Parse Cache
+----------------
+Keeps the parsed content of SuSi files in a cache directory so unchanged
+files do not have to be parsed again. Each file is stored as one .npz
+archive (performance table, I-V table, parameter block) named after a hash
+of its absolute path, modification time and size, so any edit of the file
+results in a new key.
+"""
+
+import hashlib
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from susi_parser import parse_susi_file, parse_header
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".susi_cache")
+# Bump when the parser output changes so stale entries are not reused.
+CACHE_VERSION = 2
+
+
+def cache_key(file_path):
+    st = os.stat(file_path)
+    ident = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|{CACHE_VERSION}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+def _frame_to_arrays(frame):
+    values = frame.to_numpy(dtype=float)
+    columns = np.array([str(c) for c in frame.columns])
+    return values, columns
+
+
+def store_entry(file_path, entry, cache_dir=DEFAULT_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    perf_values, perf_columns = _frame_to_arrays(entry["performance"])
+    arrays = {
+        "filename": np.array(entry["filename"]),
+        "params": np.array(entry["params"]),
+        "active_area": np.array(entry["active_area"] if entry["active_area"] is not None else ""),
+        "perf_values": perf_values,
+        "perf_columns": perf_columns,
+    }
+    if entry["iv"] is not None:
+        arrays["iv_values"], arrays["iv_columns"] = _frame_to_arrays(entry["iv"])
+    # Write to a temporary file first so a crash never leaves a half-written entry behind.
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, os.path.join(cache_dir, cache_key(file_path) + ".npz"))
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def load_entry(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the cached measurement dict for file_path, or None on a cache miss."""
+    path = os.path.join(cache_dir, cache_key(file_path) + ".npz")
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            perf = pd.DataFrame(npz["perf_values"], columns=list(npz["perf_columns"]))
+            iv = None
+            if "iv_values" in npz.files:
+                iv = pd.DataFrame(npz["iv_values"], columns=list(npz["iv_columns"]))
+            active_area = str(npz["active_area"]) or None
+            params = str(npz["params"])
+            header, header_units = parse_header(params)
+            return {
+                "filename": str(npz["filename"]),
+                "performance": perf,
+                "iv": iv,
+                "active_area": active_area,
+                "params": params,
+                "header": header,
+                "header_units": header_units,
+            }
+    except (OSError, KeyError, ValueError):
+        # Corrupt or incompatible entry: treat as a miss, it gets rewritten.
+        return None
+
+
+def parse_susi_file_cached(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    entry = load_entry(file_path, cache_dir)
+    if entry is None:
+        entry = parse_susi_file(file_path)
+        try:
+            store_entry(file_path, entry, cache_dir)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry for {file_path}: {e}")
+    return entry
+
+
+def clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npz"):
+            os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,292 @@
+"""
+SuSi Campaign Files
+-------------------
+Packs the metrics and I-V curves of many measurement files into flat binary
+arrays, so a campaign of tens of thousands of files (e.g. a stability study)
+can be plotted without parsing the files or holding them as DataFrames:
+the arrays are opened with np.memmap and only the slices of the files that
+are selected are read from disk.
+
+    python SuSi_analysis_tool.py campaign --inputs /data/stability --out stability.susi
+    python SuSi_analysis_tool.py batch --campaign stability.susi --query-filename "dev_01*" --out report.png
+
+A campaign is a directory with
+  campaign.json      format version, array lengths, the STORE_METRICS names, the
+                     dtype of the I-V arrays and per file its filename, active
+                     area, parameter header and the column names of its
+                     performance and I-V tables,
+  metrics.bin        (rows x STORE_METRICS) float64, the MeasurementStore matrix,
+  row_offsets.bin    (files + 1) int64, first row of every file,
+  curve_offsets.bin  (files + 1) int64, first I-V curve of every file,
+  curve_row.bin      (curves) int64, row of every curve within its file, -1 if none,
+  point_offsets.bin  (curves + 1) int64, first point of every curve in current.bin,
+  axis_offsets.bin   (curves) int64, first point of the voltage axis of every
+                     curve in voltage.bin,
+  voltage.bin        (points) the voltage axes; the curves of a file measured on
+                     the same voltages share one axis,
+  current.bin        (points) the current densities of all curves in mA/cm².
+voltage.bin and current.bin hold float64, or float32 if the campaign was
+written with iv_dtype="float32", which halves their size. All arrays are
+little-endian and written file by file, in input order.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from susi_parser import default_workers, parse_header
+from susi_cache import DEFAULT_CACHE_DIR
+from susi_engine import (STORE_METRICS, METRIC_ROWS, MeasurementStore, load_measurements, make_measurement,
+                         concat_ranges)
+from susi_index import archive_files
+
+CAMPAIGN_VERSION = 2
+MANIFEST = "campaign.json"
+# name -> (dtype, columns); the row count of every array is kept in the manifest.
+# The I-V arrays (dtype None) are stored in the dtype named in the manifest.
+ARRAYS = {
+    "metrics": ("<f8", len(STORE_METRICS)),
+    "row_offsets": ("<i8", None),
+    "curve_offsets": ("<i8", None),
+    "curve_row": ("<i8", None),
+    "point_offsets": ("<i8", None),
+    "axis_offsets": ("<i8", None),
+    "voltage": (None, None),
+    "current": (None, None),
+}
+
+
+def write_campaign(path, file_paths, max_workers=None, cache_dir=None, chunk_size=500, progress=None,
+                   cancel_event=None, iv_dtype="float64"):
+    """Pack the measurement files into a campaign directory at path; returns (files written, errors).
+
+    The files are loaded chunk_size at a time, so memory use does not grow
+    with the campaign. errors is a list of (file_path, exception) as from
+    load_measurements. A cancelled run leaves no campaign behind. iv_dtype
+    is the dtype of the stored voltages and current densities.
+    """
+    iv_dtype = np.dtype(iv_dtype).newbyteorder("<")
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    handles = {name: open(os.path.join(path, name + ".bin"), "wb") for name in ARRAYS}
+    array_lengths = {name: 0 for name in ARRAYS}
+    files = []
+    errors = []
+    n_rows = n_curves = n_points = n_axis_points = 0
+
+    def write(name, values):
+        values = np.ascontiguousarray(values, dtype=ARRAYS[name][0] or iv_dtype)
+        handles[name].write(values.tobytes())
+        array_lengths[name] += len(values)
+
+    try:
+        write("row_offsets", [0])
+        write("curve_offsets", [0])
+        write("point_offsets", [0])
+        for start in range(0, len(file_paths), chunk_size):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            measurements, chunk_errors = load_measurements(file_paths[start:start + chunk_size],
+                                                           max_workers=max_workers, cache_dir=cache_dir,
+                                                           cancel_event=cancel_event, iv_dtype=iv_dtype.name)
+            errors.extend(chunk_errors)
+            if not measurements:
+                continue
+            store = MeasurementStore(measurements)
+            curves = store.iv_curves()
+            axes, axis = curves["axes"], curves["axis"]
+            valid = ~np.isnan(axes)
+            axis_file = np.empty(len(axes), dtype=np.intp)
+            axis_file[axis] = curves["file_index"]
+            # An axis equal to the axis before it in its file is stored once
+            shared = np.zeros(len(axes), dtype=bool)
+            shared[1:] = ((axis_file[1:] == axis_file[:-1])
+                          & ((axes[1:] == axes[:-1]) | ~(valid[1:] | valid[:-1])).all(axis=1))
+            own_lengths = np.where(shared, 0, valid.sum(axis=1))
+            own_starts = np.cumsum(own_lengths) - own_lengths + n_axis_points
+            owner = np.maximum.accumulate(np.where(shared, 0, np.arange(len(axes))))
+            lengths = valid.sum(axis=1)[axis]
+            write("metrics", store.matrix)
+            write("row_offsets", store.offsets[1:] + n_rows)
+            write("curve_offsets", np.searchsorted(curves["file_index"], np.arange(1, store.n_files + 1)) + n_curves)
+            write("curve_row", np.where(curves["row"] >= 0, curves["row"] - store.offsets[curves["file_index"]], -1))
+            write("point_offsets", np.cumsum(lengths) + n_points)
+            write("axis_offsets", own_starts[owner][axis])
+            write("voltage", axes[~shared][valid[~shared]])
+            write("current", curves["current"][valid[axis]])
+            for m in measurements:
+                iv = m.get("iv")
+                files.append({"filename": m["filename"], "active_area": m.get("active_area"),
+                              "params": m.get("params", ""),
+                              "performance_columns": [str(c) for c in m["performance"].columns],
+                              "iv_columns": [str(c) for c in iv.columns] if isinstance(iv, pd.DataFrame) else []})
+            n_rows += store.n_rows
+            n_curves += len(curves["row"])
+            n_points += int(lengths.sum())
+            n_axis_points += int(own_lengths.sum())
+            if progress is not None:
+                progress(min(start + chunk_size, len(file_paths)), len(file_paths))
+    finally:
+        for handle in handles.values():
+            handle.close()
+    if cancel_event is not None and cancel_event.is_set():
+        for name in ARRAYS:
+            os.remove(os.path.join(path, name + ".bin"))
+        return 0, errors
+
+    # The manifest is written last: a campaign without one is incomplete and cannot be opened
+    manifest = {"version": CAMPAIGN_VERSION, "metrics": STORE_METRICS, "iv_dtype": iv_dtype.str,
+                "lengths": array_lengths, "files": files}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return len(files), errors
+
+
+class Campaign:
+    """A campaign directory opened for reading.
+
+    The arrays are memory-mapped, so opening a campaign only reads its
+    manifest; store() and measurements() read the slices of the selected
+    files and nothing else.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CAMPAIGN_VERSION:
+            raise ValueError(f"Unsupported campaign version {manifest.get('version')} in {path}")
+        if manifest.get("metrics") != STORE_METRICS:
+            raise ValueError(f"Campaign {path} was written with other metrics: {manifest.get('metrics')}")
+        self.files = manifest["files"]
+        self.filenames = [f["filename"] for f in self.files]
+        for name, (dtype, columns) in ARRAYS.items():
+            dtype = dtype or manifest["iv_dtype"]
+            length = manifest["lengths"][name]
+            shape = (length, columns) if columns else (length,)
+            if length == 0:
+                # np.memmap cannot map an empty file
+                array = np.empty(shape, dtype=dtype)
+            else:
+                array = np.memmap(os.path.join(path, name + ".bin"), dtype=dtype, mode="r", shape=shape)
+            setattr(self, name, array)
+
+    @property
+    def n_files(self):
+        return len(self.files)
+
+    def select(self, filename=None):
+        """Indices of the files whose name matches the glob pattern filename (all files without one)."""
+        if not filename:
+            return np.arange(self.n_files)
+        return np.array([i for i, name in enumerate(self.filenames) if fnmatch.fnmatch(name, filename)],
+                        dtype=np.intp)
+
+    def _curves(self, file_ids, row_offsets):
+        # I-V curves of the selected files as NaN-padded arrays, laid out like MeasurementStore.iv_curves()
+        curve_starts = np.asarray(self.curve_offsets[file_ids], dtype=np.intp)
+        curve_stops = np.asarray(self.curve_offsets[file_ids + 1], dtype=np.intp)
+        curve_ids = concat_ranges(curve_starts, curve_stops)
+        file_index = np.repeat(np.arange(len(file_ids)), curve_stops - curve_starts)
+        local_row = np.asarray(self.curve_row[curve_ids], dtype=np.intp)
+        row = np.where(local_row >= 0, local_row + row_offsets[file_index], -1)
+        point_starts = np.asarray(self.point_offsets[curve_ids], dtype=np.intp)
+        point_stops = np.asarray(self.point_offsets[curve_ids + 1], dtype=np.intp)
+        lengths = point_stops - point_starts
+        # Every stored voltage axis is read once, for all the curves measured on it
+        axis_starts, first, axis = np.unique(np.asarray(self.axis_offsets[curve_ids], dtype=np.intp),
+                                             return_index=True, return_inverse=True)
+        axis_lengths = lengths[first]
+        n_points = int(lengths.max()) if len(lengths) else 0
+        axes = np.full((len(axis_starts), n_points), np.nan, dtype=self.voltage.dtype.newbyteorder("="))
+        current = np.full((len(curve_ids), n_points), np.nan, dtype=self.current.dtype.newbyteorder("="))
+        axis_rows = np.arange(len(axis_starts)) * n_points
+        target = concat_ranges(axis_rows, axis_rows + axis_lengths)
+        axes.flat[target] = self.voltage[concat_ranges(axis_starts, axis_starts + axis_lengths)]
+        curve_rows = np.arange(len(curve_ids)) * n_points
+        target = concat_ranges(curve_rows, curve_rows + lengths)
+        current.flat[target] = self.current[concat_ranges(point_starts, point_stops)]
+        return {"axes": axes, "axis": axis.ravel().astype(np.intp), "current": current, "file_index": file_index,
+                "row": row}
+
+    def store(self, file_ids, measurements=None):
+        """MeasurementStore over the selected files, built from the campaign arrays.
+
+        measurements default to those of measurements(file_ids, tables=False),
+        which is all a comparison plot needs.
+        """
+        file_ids = np.asarray(file_ids, dtype=np.intp)
+        if measurements is None:
+            measurements = self.measurements(file_ids, tables=False)
+        row_starts = np.asarray(self.row_offsets[file_ids], dtype=np.intp)
+        row_stops = np.asarray(self.row_offsets[file_ids + 1], dtype=np.intp)
+        offsets = np.concatenate([[0], np.cumsum(row_stops - row_starts)]).astype(np.intp)
+        matrix = np.array(self.metrics[concat_ranges(row_starts, row_stops)])
+        return MeasurementStore.from_arrays(measurements, matrix, offsets, self._curves(file_ids, offsets))
+
+    def measurements(self, file_ids, tables=True):
+        """Measurement dicts of the selected files.
+
+        With tables, the performance table (the METRIC_ROWS rows) and the I-V
+        table are rebuilt from the arrays; otherwise both are None and, as
+        after MeasurementStore.drop_tables, the I-V column names are kept as
+        "iv_columns".
+        """
+        file_ids = np.asarray(file_ids, dtype=np.intp)
+        if tables:
+            store = self.store(file_ids, [{"filename": self.filenames[i]} for i in file_ids])
+            order = sorted(METRIC_ROWS, key=METRIC_ROWS.get)
+        measurements = []
+        for k, i in enumerate(file_ids):
+            info = self.files[i]
+            header, header_units = parse_header(info["params"])
+            performance = iv = None
+            if tables:
+                rows = slice(store.offsets[k], store.offsets[k + 1])
+                performance = pd.DataFrame([store.metrics[name][rows] for name in order],
+                                           columns=info["performance_columns"])
+                iv = store.iv_table(k, info["iv_columns"])
+            measurement = make_measurement(info["filename"], performance, iv, info["active_area"], info["params"],
+                                           header, header_units)
+            if not tables:
+                measurement["iv_columns"] = info["iv_columns"]
+            measurements.append(measurement)
+        return measurements
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="SuSi_analysis_tool.py campaign",
+                                     description="Pack SuSi measurement files into a memory-mapped campaign.")
+    parser.add_argument("--inputs", nargs="+", required=True,
+                        help="directories (searched recursively), files or glob patterns")
+    parser.add_argument("--out", required=True, help="campaign directory to write")
+    parser.add_argument("--float32", action="store_true",
+                        help="store the I-V data in single precision (half the size)")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="parser processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="parse cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the files")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    file_paths = archive_files(args.inputs)
+    if not file_paths:
+        print("No input files found.", file=sys.stderr)
+        return 1
+    written, errors = write_campaign(args.out, file_paths, max_workers=args.workers,
+                                     cache_dir=None if args.no_cache else args.cache_dir,
+                                     iv_dtype="float32" if args.float32 else "float64")
+    for file_path, error in errors:
+        print(f"Failed to load {file_path}: {error}", file=sys.stderr)
+    print(f"Packed {written} files into: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+SuSi Diode Model Fit
+--------------------
+Fits the single-diode model
+
+    J = Jph - J0 * (exp((V + J*Rs) / (n*Vt)) - 1) - (V + J*Rs) / Rsh
+
+to measured I-V curves. The model is evaluated explicitly through the
+Lambert W function, and a Levenberg-Marquardt fit runs on a whole batch of
+curves at once; batches are spread over a process pool with
+fit_curves_parallel.
+
+As everywhere in the tool, curves are (curves x points) arrays of voltage
+in V and current density in mA/cm², padded with NaN; fit_curves_parallel
+also takes shared voltage rows with an axis index (see susi_iv). The fitted
+parameters are reported per unit area: Iph and I0 in mA/cm², Rs and Rsh in
+Ω·cm², n dimensionless.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from susi_iv import value_at_zero, resistances, curve_voltages
+from susi_parser import default_workers
+
+DIODE_PARAMETERS = ["Iph", "I0", "n", "Rs", "Rsh", "rmse"]
+BOLTZMANN_OVER_Q = 8.617333262e-5  # V/K
+# Lower and upper limits of n, ln Rs and ln Rsh during the fit
+BOUNDS = (np.array([0.5, np.log(1e-4), np.log(1.0)]), np.array([10.0, np.log(1e3), np.log(1e8)]))
+
+
+def lambertw_log(log_x, iterations=8):
+    """Principal branch W(x) for x = exp(log_x) > 0, without ever forming x.
+
+    Solves w + ln(w) = log_x by Newton iteration, so arguments far beyond
+    the float range (as in the diode model under forward bias) stay finite.
+    """
+    log_x = np.asarray(log_x, dtype=float)
+    small = np.exp(np.minimum(log_x, 1.0))
+    large = np.maximum(log_x, 1.0)
+    w = np.where(log_x > 1.0, large - np.log(large), small / (1.0 + small))
+    w = np.maximum(w, np.finfo(float).tiny)
+    for _ in range(iterations):
+        w = w * (1.0 + log_x - np.log(w)) / (1.0 + w)
+    return w
+
+
+def diode_current(voltage, jph, j0, n, rs, rsh, temperature=298.15):
+    """Current density in A/cm² of the single-diode model; parameters are per-curve columns or scalars."""
+    nvt = n * BOLTZMANN_OVER_Q * temperature
+    total = rs + rsh
+    log_arg = (np.log(rs * j0 * rsh / (nvt * total))
+               + rsh * (rs * (jph + j0) + voltage) / (nvt * total))
+    return (rsh * (jph + j0) - voltage) / total - nvt / rs * lambertw_log(log_arg)
+
+
+def _model(p, voltage, temperature):
+    # p holds per-curve [Jph, ln J0, n, ln Rs, ln Rsh] in A/cm² and Ω·cm²
+    return diode_current(voltage, p[:, 0:1], np.exp(p[:, 1:2]), p[:, 2:3], np.exp(p[:, 3:4]),
+                         np.exp(p[:, 4:5]), temperature)
+
+
+def _residuals(p, voltage, current, valid, temperature):
+    # In mA/cm² so the cost is of order one; non-finite model values make the step fail
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        r = 1000.0 * (_model(p, voltage, temperature) - current)
+    r = np.where(valid, r, 0.0)
+    cost = np.where(np.isfinite(r).all(axis=1), (r * r).sum(axis=1), np.inf)
+    return np.nan_to_num(r), cost
+
+
+def _initial_guess(voltage, current, valid, temperature):
+    # Start from Jsc, Voc and the slope resistances, with n and the Rs fraction
+    # taken from a small grid: the point with the lowest cost for each curve
+    vt = BOLTZMANN_OVER_Q * temperature
+    measured = np.where(valid, current, np.nan)
+    jsc = np.abs(value_at_zero(np.where(valid, voltage, np.nan), measured))
+    voc = np.abs(value_at_zero(measured, np.where(valid, voltage, np.nan)))
+    rs, rsh = resistances(np.where(valid, voltage, np.nan), measured)
+    jph = np.nan_to_num(jsc, nan=20.0) / 1000.0
+    voc = np.nan_to_num(voc, nan=0.6)
+    rs = np.nan_to_num(rs, nan=1.0)
+    rsh = np.clip(np.nan_to_num(rsh, nan=1e4), 10.0, 1e6)
+    best, best_cost = None, None
+    for n in (1.0, 1.5, 2.0, 2.5):
+        for fraction in (0.1, 0.5, 0.9):
+            j0 = np.maximum(jph / np.exp(voc / (n * vt)), 1e-300)
+            p = np.column_stack([jph, np.log(j0), np.full(len(jph), n),
+                                 np.log(np.clip(fraction * rs, 1e-3, 100.0)), np.log(rsh)])
+            _, cost = _residuals(p, voltage, current / 1000.0, valid, temperature)
+            if best is None:
+                best, best_cost = p, cost
+            else:
+                better = cost < best_cost
+                best[better], best_cost[better] = p[better], cost[better]
+    return best
+
+
+def fit_curves(voltage, current, temperature=298.15, max_iter=200):
+    """Fit the single-diode model to every curve; returns {parameter: array with one value per curve}.
+
+    Curves in either sign convention are accepted (the power quadrant is
+    found from the sign of Jsc). Curves with fewer than six points or a fit
+    that fails give NaN. rmse is the fit residual in mA/cm².
+    """
+    voltage = np.asarray(voltage, dtype=float)
+    current = np.asarray(current, dtype=float)
+    orientation = np.where(value_at_zero(voltage, current) < 0, -1.0, 1.0)
+    current = current * orientation[:, None]
+    valid = np.isfinite(voltage) & np.isfinite(current)
+    voltage = np.where(valid, voltage, 0.0)
+    current_a = np.where(valid, current, 0.0) / 1000.0
+
+    p = _initial_guess(voltage, np.where(valid, current, 0.0), valid, temperature)
+    r, cost = _residuals(p, voltage, current_a, valid, temperature)
+    damping = np.full(len(p), 1e-2)
+    active = np.isfinite(cost) & (valid.sum(axis=1) >= 6)
+    eye = np.eye(p.shape[1])
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        idx = np.flatnonzero(active)
+        pa, ra = p[idx], r[idx]
+        # Forward-difference Jacobian, all curves and parameters at once
+        jac = np.empty(ra.shape + (p.shape[1],))
+        for k in range(p.shape[1]):
+            step = 1e-6 * np.maximum(np.abs(pa[:, k]), 1.0)
+            shifted = pa.copy()
+            shifted[:, k] += step
+            rk, _ = _residuals(shifted, voltage[idx], current_a[idx], valid[idx], temperature)
+            jac[:, :, k] = (rk - ra) / step[:, None]
+        jtj = np.einsum("cpk,cpl->ckl", jac, jac)
+        grad = np.einsum("cpk,cp->ck", jac, ra)
+        diag = np.einsum("ckk->ck", jtj)
+        scale = (diag + 1e-12 * diag.max(axis=1, keepdims=True) + 1e-30)[:, :, None] * eye
+        system = jtj + damping[idx, None, None] * scale
+        try:
+            delta = np.linalg.solve(system, -grad[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            delta = -(np.linalg.pinv(system) @ grad[:, :, None])[:, :, 0]
+        trial = pa + delta
+        trial[:, 2:] = np.clip(trial[:, 2:], BOUNDS[0], BOUNDS[1])
+        r_new, cost_new = _residuals(trial, voltage[idx], current_a[idx], valid[idx], temperature)
+        better = cost_new < cost[idx]
+        improved = idx[better]
+        converged = better & (cost[idx] - cost_new <= 1e-10 * cost[idx] + 1e-14)
+        p[improved], r[improved], cost[improved] = trial[better], r_new[better], cost_new[better]
+        damping[idx] = np.where(better, damping[idx] * 0.3, damping[idx] * 10.0)
+        active[idx[converged | (damping[idx] > 1e12)]] = False
+
+    fitted = np.isfinite(cost) & (valid.sum(axis=1) >= 6)
+    n_points = np.maximum(valid.sum(axis=1), 1)
+    result = {"Iph": 1000.0 * p[:, 0], "I0": 1000.0 * np.exp(p[:, 1]), "n": p[:, 2],
+              "Rs": np.exp(p[:, 3]), "Rsh": np.exp(p[:, 4]), "rmse": np.sqrt(cost / n_points)}
+    for name in DIODE_PARAMETERS:
+        result[name] = np.where(fitted, result[name], np.nan)
+    return result
+
+
+def fit_curves_parallel(voltage, current, temperature=298.15, max_workers=None, chunk_size=256,
+                        progress=None, cancel_event=None, axis=None):
+    """fit_curves over chunks of curves in a process pool; returns the same dict.
+
+    With axis, voltage holds the shared voltage rows, gathered chunk by
+    chunk. progress(done, total) is called per finished curve count; once
+    cancel_event is set, pending chunks are dropped and their curves stay NaN.
+    """
+    total = len(current)
+    result = {name: np.full(total, np.nan) for name in DIODE_PARAMETERS}
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    if max_workers is None:
+        max_workers = default_workers()
+    max_workers = max(1, min(max_workers, len(chunks)))
+    done = 0
+
+    def chunk_voltage(start, stop):
+        return voltage[start:stop] if axis is None else curve_voltages(voltage, axis[start:stop])
+
+    def store(chunk, fitted):
+        start, stop = chunk
+        for name in DIODE_PARAMETERS:
+            result[name][start:stop] = fitted[name]
+
+    if max_workers == 1:
+        for chunk in chunks:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            store(chunk, fit_curves(chunk_voltage(*chunk), current[chunk[0]:chunk[1]], temperature))
+            done += chunk[1] - chunk[0]
+            if progress is not None:
+                progress(done, total)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fit_curves, chunk_voltage(start, stop), current[start:stop], temperature):
+                       (start, stop) for start, stop in chunks}
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                chunk = futures[future]
+                store(chunk, future.result())
+                done += chunk[1] - chunk[0]
+                if progress is not None:
+                    progress(done, total)
+    return result
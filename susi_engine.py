@@ -0,0 +1,685 @@
+"""
+SuSi Engine
+-----------
+The GUI-independent data layer of the SuSi Analysis Tool: loading, the
+measurement model, metric extraction, filtering, grouping and summary
+statistics. The Tk GUI, the batch mode and worker processes all call into
+this module; nothing here imports tkinter or matplotlib.
+
+A measurement is a plain dict with the keys
+  "filename"     base name of the file (or the group name),
+  "performance"  float DataFrame with one column per pixel sweep (Fwd, Rev
+                 alternating) and the rows J_sc, V_oc, Fill Factor, Efficiency,
+  "iv"           DataFrame with the voltage in column 0 followed by Fwd/Rev
+                 current density pairs (float64, or float32 if loaded with
+                 iv_dtype="float32"), or None; None as well once a
+                 MeasurementStore has taken the curves over (drop_tables),
+  "iv_columns"   (only after drop_tables) the column names of the dropped
+                 table, for MeasurementStore.iv_table,
+  "active_area"  active area string from the header, or None,
+  "params"       the parameter header block as text,
+  "header"       {key: typed value} of the header lines (float, (start, stop) range,
+                 datetime or text, see susi_parser.parse_header_value),
+  "header_units" {key: unit or None} of the same lines,
+  "members"      (only for groups, see MeasurementStore.grouped) indices of the
+                 grouped files in the store the group was made from,
+  "diode_fit"    (only once fitted, see MeasurementStore.diode_fit) DataFrame with
+                 one row per current column of "iv" and the single-diode model
+                 parameters Iph, I0, n, Rs, Rsh and the fit rmse as columns.
+
+For plotting and filtering, a list of measurements is wrapped in a
+MeasurementStore, which holds every metric as one flat array over all pixel
+sweeps of all files and all I-V curves as padded arrays. The GUI and batch
+mode then drop the I-V tables, so the store is the only holder of the
+curves. Grouping files gives another store over the same data
+(MeasurementStore.grouped); the measurements themselves are never changed.
+
+The tables are numeric from the moment they are parsed (susi_parser converts
+them once, while reading), so nothing here coerces them again.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from susi_parser import load_files_parallel
+from susi_iv import IV_PARAMETERS, iv_parameters, pad_curves, resistances, curve_area, hysteresis_index
+from susi_diode import DIODE_PARAMETERS, fit_curves_parallel
+
+METRICS = ["Jsc", "Voc", "Efficiency", "Fill Factor"]
+# Metrics derived by the store and kept next to METRICS: series/shunt resistance of
+# the row's I-V curve, and the hysteresis index of its pixel from the PCE and from
+# the areas under the Fwd/Rev curves.
+DERIVED_METRICS = ["Rs", "Rsh", "HI", "HI area"]
+STORE_METRICS = METRICS + DERIVED_METRICS
+# Metrics with one value per pixel, stored on both its Fwd and its Rev row
+PIXEL_METRICS = ["HI", "HI area"]
+# ASSUMPTION: Row order of the performance table: 0:J_sc, 1:V_oc, 2:Fill Factor, 3:Efficiency
+METRIC_ROWS = {"Jsc": 0, "Voc": 1, "Fill Factor": 2, "Efficiency": 3}
+DIRECTIONS = ["Fwd", "Rev"]
+
+
+# ---------------------------------------------------------------------------
+# Loading and measurement model
+# ---------------------------------------------------------------------------
+
+def make_measurement(filename, performance, iv=None, active_area=None, params="", header=None, header_units=None):
+    return {"filename": filename, "performance": performance, "iv": iv,
+            "active_area": active_area, "params": params, "header": header or {},
+            "header_units": header_units or {}}
+
+
+def load_measurements(file_paths, max_workers=None, cache_dir=None, progress=None, cancel_event=None,
+                      iv_dtype=None):
+    """Load SuSi files; returns (measurements, errors) in selection order.
+
+    errors is a list of (file_path, exception). Files without a performance
+    table are skipped silently. iv_dtype="float32" stores the I-V tables
+    (and the curves of a MeasurementStore over them) in single precision.
+    """
+    measurements = []
+    errors = []
+    for file_path, entry, error in load_files_parallel(file_paths, max_workers=max_workers, progress=progress,
+                                                       cancel_event=cancel_event, cache_dir=cache_dir,
+                                                       iv_dtype=iv_dtype):
+        if isinstance(error, pd.errors.EmptyDataError):
+            continue
+        if error is not None:
+            errors.append((file_path, error))
+            continue
+        measurements.append(entry)
+    return measurements, errors
+
+
+def extract_metrics(measurement):
+    """Return {metric: float array with one value per pixel sweep} from the performance table."""
+    values = measurement["performance"].to_numpy(dtype=float)
+    return {name: values[row] for name, row in METRIC_ROWS.items()}
+
+
+def split_fwd_rev(values):
+    if len(values) % 2 != 0:
+        values = values[:-1]
+    return values[::2], values[1::2]
+
+
+def area_value(text):
+    """Numeric value of an active area string such as "0.16 cm²"; NaN if there is none."""
+    match = re.search(r"[-+]?\d*[.,]?\d+(?:[eE][-+]?\d+)?", text or "")
+    return float(match.group(0).replace(",", ".")) if match else np.nan
+
+
+def split_iv_blocks(iv):
+    """Split an I-V table into [(voltage, currents)] blocks, one per measured file.
+
+    A grouped measurement concatenates the tables of its members, so every
+    member starts with its own copy of the voltage column. currents is a
+    (points x columns) array of the table's float dtype; rows with a missing
+    voltage are dropped.
+    """
+    if not isinstance(iv, pd.DataFrame) or iv.shape[1] < 2:
+        return []
+    # No copy for a table of one dtype; float32 tables stay float32
+    values = iv.to_numpy()
+    names = [str(c) for c in iv.columns]
+    starts = [c for c, name in enumerate(names) if name == names[0]] + [len(names)]
+    blocks = []
+    for start, stop in zip(starts[:-1], starts[1:]):
+        voltage = values[:, start]
+        keep = ~np.isnan(voltage)
+        if stop - start > 1:
+            blocks.append((voltage[keep], values[keep, start + 1:stop]))
+    return blocks
+
+
+def concat_ranges(starts, stops):
+    """np.arange(start, stop) of every pair of starts and stops, concatenated, without a Python loop."""
+    counts = stops - starts
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)
+    return np.repeat(starts - first, counts) + np.arange(int(counts.sum()))
+
+
+class MeasurementStore:
+    """Columnar metrics of a list of measurements.
+
+    Every pixel sweep of every file is one row. matrix stacks the metrics
+    column-wise in STORE_METRICS order and metrics[name] is a view of one
+    column; the performance table metrics are followed by DERIVED_METRICS
+    (NaN where the row has no I-V curve or no partner sweep).
+    file_index, pixel and direction (0 = Fwd, 1 = Rev) are the index columns.
+    Rows of a file are contiguous and start at offsets[file_index], so
+    per-file arrays are cheap views.
+
+    Filter masks are cached: a metric column (or the voltage masks of the
+    I-V curves) is only re-evaluated when its filter range changes.
+
+    The I-V curves are not necessarily ordered by file (see grouped);
+    curve_order() lists them file by file.
+    """
+
+    def __init__(self, measurements):
+        self.measurements = measurements
+        self.filenames = [m["filename"] for m in measurements]
+        columns = {name: [] for name in METRICS}
+        counts = []
+        for m in measurements:
+            try:
+                metrics = extract_metrics(m)
+            except Exception as ex:
+                print(f"Warning: Could not extract performance metrics from file {m['filename']}: {ex}")
+                metrics = {name: np.empty(0) for name in METRICS}
+            counts.append(len(metrics["Jsc"]))
+            for name in METRICS:
+                columns[name].append(metrics[name])
+        self.offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.intp)]).astype(np.intp)
+        self.matrix = np.full((self.n_rows, len(STORE_METRICS)), np.nan)
+        for j, name in enumerate(METRICS):
+            if counts:
+                self.matrix[:, j] = np.concatenate(columns[name])
+        self.metrics = {name: self.matrix[:, j] for j, name in enumerate(STORE_METRICS)}
+        self.file_index = np.repeat(np.arange(len(measurements)), counts)
+        local_column = np.arange(self.n_rows) - self.offsets[self.file_index]
+        self.pixel = local_column // 2
+        self.direction = local_column % 2
+
+        self._mask = np.ones(self.matrix.shape, dtype=bool)
+        self._mask_ranges = [None] * len(STORE_METRICS)
+        self._filtered = None
+        self._voltage_range = None
+        self._voltage_masks = None
+        self._iv_curves = None
+        self._curve_order = None
+        self._diode_fit = None
+        self._diode_fit_temperature = None
+
+        curves = self.iv_curves()
+        known = curves["row"] >= 0
+        rs, rsh = resistances(curves["axes"], curves["current"][known], axis=curves["axis"][known])
+        self.metrics["Rs"][curves["row"][known]] = rs
+        self.metrics["Rsh"][curves["row"][known]] = rsh
+
+        # Hysteresis index per pixel: Fwd rows whose Rev partner is in the same file
+        fwd = np.flatnonzero((self.direction == 0) & (np.arange(self.n_rows) + 1 < self.offsets[self.file_index + 1]))
+        rev = fwd + 1
+        efficiency = self.metrics["Efficiency"]
+        self.metrics["HI"][fwd] = self.metrics["HI"][rev] = hysteresis_index(efficiency[fwd], efficiency[rev])
+        area = np.full(self.n_rows, np.nan)
+        area[curves["row"][known]] = curve_area(curves["axes"], curves["current"][known], axis=curves["axis"][known])
+        self.metrics["HI area"][fwd] = self.metrics["HI area"][rev] = hysteresis_index(area[fwd], area[rev])
+
+    @classmethod
+    def from_arrays(cls, measurements, matrix, offsets, iv_curves):
+        """A store over already computed arrays, without reading the measurement tables.
+
+        matrix holds the STORE_METRICS columns of every row, offsets the first
+        row of every file (plus the total) and iv_curves is laid out like the
+        result of iv_curves(). Filter masks and the diode fit are computed on
+        first use.
+        """
+        store = cls.__new__(cls)
+        store.measurements = measurements
+        store.filenames = [m["filename"] for m in measurements]
+        store.offsets = np.asarray(offsets, dtype=np.intp)
+        store.matrix = matrix
+        store.metrics = {name: store.matrix[:, j] for j, name in enumerate(STORE_METRICS)}
+        counts = np.diff(store.offsets)
+        store.file_index = np.repeat(np.arange(len(measurements)), counts)
+        local_column = np.arange(store.n_rows) - store.offsets[store.file_index]
+        store.pixel = local_column // 2
+        store.direction = local_column % 2
+
+        store._mask = np.ones(store.matrix.shape, dtype=bool)
+        store._mask_ranges = [None] * len(STORE_METRICS)
+        store._filtered = None
+        store._voltage_range = None
+        store._voltage_masks = None
+        store._iv_curves = iv_curves
+        store._curve_order = None
+        store._diode_fit = None
+        store._diode_fit_temperature = None
+        return store
+
+    @classmethod
+    def concat(cls, stores):
+        """One store over the files of several stores, in order, without reprocessing their files.
+
+        The metric arrays and the I-V curves (with their voltage axes) of the
+        stores are stacked; filter masks and the diode fit are computed anew
+        on first use.
+        """
+        row_starts = np.cumsum([0] + [s.n_rows for s in stores])
+        file_starts = np.cumsum([0] + [s.n_files for s in stores])
+        offsets = np.concatenate([[0]] + [s.offsets[1:] + start for s, start in zip(stores, row_starts)])
+        curves = [s.iv_curves() for s in stores]
+        n_points = max([c["axes"].shape[1] for c in curves], default=0)
+        axis_starts = np.cumsum([0] + [len(c["axes"]) for c in curves])
+
+        def padded(name):
+            return np.vstack([np.pad(c[name], ((0, 0), (0, n_points - c[name].shape[1])), constant_values=np.nan)
+                              for c in curves]) if curves else np.empty((0, 0))
+
+        iv_curves = {
+            "axes": padded("axes"), "current": padded("current"),
+            "axis": np.concatenate([c["axis"] + start for c, start in zip(curves, axis_starts)]
+                                   + [np.empty(0, dtype=np.intp)]),
+            "file_index": np.concatenate([c["file_index"] + start for c, start in zip(curves, file_starts)]
+                                         + [np.empty(0, dtype=np.intp)]),
+            "row": np.concatenate([np.where(c["row"] >= 0, c["row"] + start, -1)
+                                   for c, start in zip(curves, row_starts)] + [np.empty(0, dtype=np.intp)]),
+        }
+        matrix = np.vstack([s.matrix for s in stores]) if stores else np.empty((0, len(STORE_METRICS)))
+        return cls.from_arrays([m for s in stores for m in s.measurements], matrix, offsets, iv_curves)
+
+    def grouped(self, groups):
+        """A store with one entry per group, made of index arrays over this store.
+
+        groups maps group name -> list of file indices of this store, in plot
+        order; every file must be in exactly one group. The rows of a group
+        are the rows of its files in the given order, so its pixel sweeps are
+        numbered on across the files. Only the metric rows are gathered: the
+        I-V curve arrays are shared with this store, in their original order,
+        and this store is left unchanged. Costs O(files + rows).
+        """
+        members = [np.asarray(indices, dtype=np.intp) for indices in groups.values()]
+        order = np.concatenate(members + [np.empty(0, dtype=np.intp)])
+        if len(order) != self.n_files or not np.array_equal(np.sort(order), np.arange(self.n_files)):
+            raise ValueError("Every file must belong to exactly one group")
+        group_of_file = np.empty(self.n_files, dtype=np.intp)
+        group_of_file[order] = np.repeat(np.arange(len(members)), [len(m) for m in members])
+        counts = np.diff(self.offsets)
+        rows = concat_ranges(self.offsets[order], self.offsets[order + 1])
+        offsets = np.concatenate([[0], np.cumsum([counts[m].sum() for m in members])]).astype(np.intp)
+        new_row = np.empty(self.n_rows, dtype=np.intp)
+        new_row[rows] = np.arange(self.n_rows)
+
+        curves = self.iv_curves()
+        iv_curves = {"axes": curves["axes"], "axis": curves["axis"], "current": curves["current"],
+                     "file_index": group_of_file[curves["file_index"]],
+                     "row": np.where(curves["row"] >= 0, new_row[curves["row"]], -1)}
+        measurements = []
+        for name, indices in zip(groups, members):
+            files = [self.measurements[i] for i in indices]
+            first = files[0] if files else {}
+            measurement = make_measurement(name, None, None, first.get("active_area"),
+                                           "\n\n".join(m.get("params", "") for m in files),
+                                           first.get("header"), first.get("header_units"))
+            measurement["members"] = [int(i) for i in indices]
+            measurements.append(measurement)
+        store = MeasurementStore.from_arrays(measurements, self.matrix[rows], offsets, iv_curves)
+        # Curves of a group member by member, like the rows
+        position = np.empty(self.n_files, dtype=np.intp)
+        position[order] = np.arange(self.n_files)
+        store._curve_order = np.argsort(position[curves["file_index"]], kind="stable")
+        return store
+
+    @property
+    def n_files(self):
+        return len(self.measurements)
+
+    @property
+    def n_rows(self):
+        return int(self.offsets[-1])
+
+    def filter_mask(self, filter_options):
+        """Boolean matrix like self.matrix, True where a value lies inside its filter range."""
+        for j, name in enumerate(STORE_METRICS):
+            value_range = tuple(filter_options.get(name, (-np.inf, np.inf)))
+            if value_range != self._mask_ranges[j]:
+                low, high = value_range
+                column = self.matrix[:, j]
+                self._mask[:, j] = (column >= low) & (column <= high)
+                self._mask_ranges[j] = value_range
+                self._filtered = None
+        return self._mask
+
+    def filtered(self, filter_options):
+        """Return {metric: array over all rows} with the filtered-out values set to NaN."""
+        mask = self.filter_mask(filter_options)
+        if self._filtered is None:
+            matrix = np.where(mask, self.matrix, np.nan)
+            self._filtered = {name: matrix[:, j] for j, name in enumerate(STORE_METRICS)}
+        return self._filtered
+
+    def voltage_masks(self, filter_options):
+        """Boolean mask like iv_curves()["axes"] selecting the I-V points inside the voltage range."""
+        value_range = tuple(filter_options["Voltage"])
+        if value_range != self._voltage_range:
+            self._voltage_masks = voltage_mask(self.iv_curves()["axes"], filter_options)
+            self._voltage_range = value_range
+        return self._voltage_masks
+
+    def iv_curves(self):
+        """All I-V curves of all files as NaN-padded arrays.
+
+        Returns a dict with "current" (curves x points), "file_index" and
+        "row", the store row (pixel sweep) each curve belongs to, or -1 if the
+        performance table has no matching column. The voltages are kept once
+        per voltage column of a file, as the rows of "axes"; "axis" is the row
+        of every curve (pass both on to the susi_iv functions). Built on first
+        use and kept.
+        """
+        if self._iv_curves is None:
+            blocks, block_file, block_column = [], [], []
+            for i, m in enumerate(self.measurements):
+                column = 0
+                for voltage, currents in split_iv_blocks(m.get("iv")):
+                    blocks.append((voltage, currents))
+                    block_file.append(i)
+                    block_column.append(column)
+                    column += currents.shape[1]
+            axes, current, block_index = pad_curves(blocks)
+            file_index = np.asarray(block_file, dtype=np.intp)[block_index]
+            # Position of each curve among the current columns of its file
+            first = np.searchsorted(block_index, block_index, side="left")
+            column = np.asarray(block_column, dtype=np.intp)[block_index] + np.arange(len(block_index)) - first
+            counts = np.diff(self.offsets)[file_index]
+            row = np.where(column < counts, self.offsets[file_index] + column, -1)
+            self._iv_curves = {"axes": axes, "axis": block_index, "current": current, "file_index": file_index,
+                               "row": row}
+        return self._iv_curves
+
+    def curve_order(self):
+        """Indices into iv_curves() that list the curves file by file (and within a group, member by member)."""
+        if self._curve_order is None:
+            self._curve_order = np.argsort(self.iv_curves()["file_index"], kind="stable")
+        return self._curve_order
+
+    def file_curves(self, file):
+        """Indices into iv_curves() of the curves of one file, in the column order of its I-V table."""
+        by_file = self.curve_order()
+        file_index = self.iv_curves()["file_index"][by_file]
+        return by_file[np.searchsorted(file_index, file):np.searchsorted(file_index, file, side="right")]
+
+    def iv_table(self, file, columns=None):
+        """The I-V table of one file rebuilt from the curve arrays, laid out like the "iv" of a measurement.
+
+        columns default to the "iv_columns" the measurement kept when its
+        table was dropped. None if the file has no I-V curves.
+        """
+        curves = self.iv_curves()
+        mine = self.file_curves(file)
+        if len(mine) == 0:
+            return None
+        # One voltage column per axis, followed by the currents measured on it
+        axes = curves["axis"][mine]
+        starts = np.flatnonzero(np.concatenate([[True], axes[1:] != axes[:-1]]))
+        lengths = (~np.isnan(curves["axes"][axes[starts]])).sum(axis=1)
+        values = np.full((int(lengths.max()), len(mine) + len(starts)), np.nan, dtype=curves["current"].dtype)
+        for k, (start, stop) in enumerate(zip(starts, np.append(starts[1:], len(mine)))):
+            column, n = start + k, lengths[k]
+            values[:n, column] = curves["axes"][axes[start], :n]
+            values[:n, column + 1:column + 1 + stop - start] = curves["current"][mine[start:stop], :n].T
+        if columns is None:
+            columns = self.measurements[file].get("iv_columns")
+        return pd.DataFrame(values, columns=None if columns is None else list(columns)[:values.shape[1]])
+
+    def drop_tables(self):
+        """Make this store the only holder of the I-V data: the "iv" table of every measurement is dropped.
+
+        The column names are kept as "iv_columns"; iv_table rebuilds a table
+        when one is needed. Stores built later from these measurements have no
+        curves, so derive them from this one (concat, select, grouped).
+        """
+        self.iv_curves()
+        for m in self.measurements:
+            iv = m.get("iv")
+            if isinstance(iv, pd.DataFrame):
+                m["iv_columns"] = [str(c) for c in iv.columns]
+                m["iv"] = None
+
+    def select(self, files):
+        """A store over the given files of this store, in that order; their rows and curves are copied."""
+        files = np.asarray(files, dtype=np.intp)
+        rows = concat_ranges(self.offsets[files], self.offsets[files + 1])
+        offsets = np.concatenate([[0], np.cumsum(self.offsets[files + 1] - self.offsets[files])]).astype(np.intp)
+        new_row = np.full(self.n_rows, -1, dtype=np.intp)
+        new_row[rows] = np.arange(len(rows))
+        curves = self.iv_curves()
+        position = np.full(self.n_files, -1, dtype=np.intp)
+        position[files] = np.arange(len(files))
+        # The curves of the selected files, file by file in the new order, each in its column order
+        by_file = self.curve_order()
+        by_file = by_file[position[curves["file_index"][by_file]] >= 0]
+        mine = by_file[np.argsort(position[curves["file_index"][by_file]], kind="stable")]
+        used, axis = np.unique(curves["axis"][mine], return_inverse=True)
+        iv_curves = {"axes": curves["axes"][used], "axis": axis.ravel().astype(np.intp),
+                     "current": curves["current"][mine], "file_index": position[curves["file_index"][mine]],
+                     "row": np.where(curves["row"][mine] >= 0, new_row[curves["row"][mine]], -1)}
+        return MeasurementStore.from_arrays([self.measurements[i] for i in files], self.matrix[rows], offsets,
+                                            iv_curves)
+
+    def curve_of_row(self):
+        """Index into iv_curves() of the I-V curve of every store row, -1 for rows without one."""
+        row = self.iv_curves()["row"]
+        curve_of_row = np.full(self.n_rows, -1, dtype=np.intp)
+        known = row >= 0
+        curve_of_row[row[known]] = np.flatnonzero(known)
+        return curve_of_row
+
+    def best_rows(self, filter_options=None):
+        """Store row of the highest-efficiency pixel sweep with an I-V curve in each file, -1 if there is none.
+
+        The efficiency comes from the performance table (with the filter
+        applied if filter_options are given); where the table has no value the
+        efficiency computed from the curve is used. One sort over all rows.
+        """
+        curve_of_row = self.curve_of_row()
+        has_curve = curve_of_row >= 0
+        efficiency = self.filtered(filter_options)["Efficiency"] if filter_options else self.metrics["Efficiency"]
+        missing = np.isnan(self.metrics["Efficiency"]) & has_curve
+        if missing.any():
+            computed = self.iv_metrics()["Efficiency"][curve_of_row[missing]]
+            efficiency = efficiency.copy()
+            efficiency[missing] = computed
+        score = np.where(has_curve & ~np.isnan(efficiency), efficiency, -np.inf)
+        # Sorted by file, best row first; ties keep the lower pixel
+        order = np.lexsort((-score, self.file_index))
+        best = np.full(self.n_files, -1, dtype=np.intp)
+        nonempty = np.diff(self.offsets) > 0
+        first = order[self.offsets[:-1][nonempty]]
+        best[nonempty] = np.where(np.isfinite(score[first]), first, -1)
+        return best
+
+    def iv_metrics(self, light_intensity=100.0, active_area=None):
+        """Compute the I-V parameters (see susi_iv.iv_parameters) of every curve in one pass.
+
+        light_intensity is the incident power in mW/cm². With active_area (cm²),
+        the current densities are rescaled from the area in each file header to
+        that area. The result also holds the "file_index" and "row" of each curve.
+        """
+        curves = self.iv_curves()
+        current = curves["current"]
+        if active_area is not None:
+            file_areas = np.array([area_value(m.get("active_area")) for m in self.measurements])
+            current = current * (file_areas[curves["file_index"]] / active_area)[:, None]
+        result = iv_parameters(curves["axes"], current, light_intensity, axis=curves["axis"])
+        result["file_index"] = curves["file_index"]
+        result["row"] = curves["row"]
+        return result
+
+    def diode_fit(self, temperature=298.15, max_workers=None, progress=None, cancel_event=None):
+        """Fit the single-diode model to every curve of iv_curves() in a process pool.
+
+        The result holds one array per DIODE_PARAMETERS entry plus "file_index"
+        and "row", like iv_metrics. Each measurement also gets its own rows as
+        a "diode_fit" DataFrame. Kept after a complete fit until another
+        temperature is asked for; a cancelled fit returns None.
+        """
+        if self._diode_fit is None or temperature != self._diode_fit_temperature:
+            curves = self.iv_curves()
+            fitted = fit_curves_parallel(curves["axes"], curves["current"], temperature, max_workers=max_workers,
+                                         progress=progress, cancel_event=cancel_event, axis=curves["axis"])
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            table = pd.DataFrame(fitted, columns=DIODE_PARAMETERS)
+            by_file = self.curve_order()
+            bounds = np.searchsorted(curves["file_index"][by_file], np.arange(self.n_files + 1))
+            for i, m in enumerate(self.measurements):
+                m["diode_fit"] = table.iloc[by_file[bounds[i]:bounds[i + 1]]].reset_index(drop=True)
+            fitted["file_index"] = curves["file_index"]
+            fitted["row"] = curves["row"]
+            self._diode_fit = fitted
+            self._diode_fit_temperature = temperature
+        return self._diode_fit
+
+    def split(self, values):
+        """Split a per-row array into a list with one view per file."""
+        if self.n_files == 0:
+            return []
+        return np.split(values, self.offsets[1:-1])
+
+
+# ---------------------------------------------------------------------------
+# Filtering
+# ---------------------------------------------------------------------------
+
+def default_filter_options():
+    return {
+        "Jsc": (-np.inf, np.inf),
+        "Voc": (-np.inf, np.inf),
+        "Efficiency": (0, 100),
+        "Fill Factor": (0, 100),
+        "Rs": (-np.inf, np.inf),
+        "Rsh": (-np.inf, np.inf),
+        "HI": (-np.inf, np.inf),
+        "HI area": (-np.inf, np.inf),
+        "Voltage": (-np.inf, np.inf)
+    }
+
+
+def apply_filter(values, filter_options, param):
+    """Return a float copy of values with everything outside the filter range of param set to NaN."""
+    low, high = filter_options.get(param, (-np.inf, np.inf))
+    values = np.array(values, dtype=float)
+    values[(values < low) | (values > high)] = np.nan
+    return values
+
+
+def voltage_mask(voltage, filter_options):
+    vlow, vhigh = filter_options["Voltage"]
+    return (voltage >= vlow) & (voltage <= vhigh)
+
+
+def prepare_multiple_plot_data(store, filter_options, report=None, cancel_event=None):
+    """Filter the metrics of a MeasurementStore and collect the I-V curves for plotting.
+
+    "metrics" maps every store metric to a list with one filtered array per
+    file ("jsc", "voc", "ff" and "eff" are the same lists). For the I-V plot, the
+    Fwd and Rev curves of the pixel with the best efficiency (after
+    filtering) are taken from every file. report(done, total) is called per
+    file; returns None if cancel_event gets set.
+    """
+    # Metrics are filtered with one cached mask over all files
+    filtered = {name: store.split(values) for name, values in store.filtered(filter_options).items()}
+
+    # I-V curves: both sweeps of the best-efficiency pixel of every file
+    curves = store.iv_curves()
+    curve_of_row = store.curve_of_row()
+    best = store.best_rows(filter_options)
+    curves_per_file = np.bincount(curves["file_index"], minlength=store.n_files)
+    by_file = store.curve_order()
+    first_curve = np.concatenate([[0], np.cumsum(curves_per_file)[:-1]]).astype(np.intp)
+    vlow, vhigh = filter_options["Voltage"]
+
+    multi_data = store.measurements
+    iv_curves = []
+    for file_num, d in enumerate(multi_data):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        if report is not None:
+            report(file_num + 1, len(multi_data))
+        n_curves = curves_per_file[file_num]
+        if n_curves == 0:
+            iv_curves.append((None, None, d["filename"]))
+            continue
+        if best[file_num] >= 0:
+            fwd_row = best[file_num] - store.direction[best[file_num]]
+            fwd = curve_of_row[fwd_row]
+            rev = curve_of_row[fwd_row + 1] if fwd_row + 1 < store.offsets[file_num + 1] else -1
+        else:
+            fwd = by_file[first_curve[file_num]]
+            rev = by_file[first_curve[file_num] + 1] if n_curves > 1 else -1
+        voltage = curves["axes"][curves["axis"][fwd if fwd >= 0 else rev]]
+        mask = (voltage >= vlow) & (voltage <= vhigh)
+        if n_curves == 1:
+            iv_curves.append((voltage[mask], curves["current"][fwd][mask], d["filename"]))
+        else:
+            y_fwd = curves["current"][fwd][mask] if fwd >= 0 else None
+            y_rev = curves["current"][rev][mask] if rev >= 0 else None
+            iv_curves.append((voltage[mask], (y_fwd, y_rev), d["filename"]))
+
+    return {"jsc": filtered["Jsc"], "voc": filtered["Voc"], "ff": filtered["Fill Factor"],
+            "eff": filtered["Efficiency"], "metrics": filtered, "iv_curves": iv_curves}
+
+
+# ---------------------------------------------------------------------------
+# Grouping
+# ---------------------------------------------------------------------------
+
+def complete_groups(groups, filenames):
+    """Copy of groups (name -> file indices) in which every file of filenames is in a group.
+
+    A file missing from groups, e.g. one loaded after the grouping was made,
+    joins the group named like the file, or else becomes a group of its own
+    after the others. Pass the result to MeasurementStore.grouped.
+    """
+    grouped = set(i for indices in groups.values() for i in indices)
+    completed = {name: list(indices) for name, indices in groups.items()}
+    for i, name in enumerate(filenames):
+        if i not in grouped:
+            completed.setdefault(name, []).append(i)
+    return completed
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def describe(values):
+    """Summary statistics of the non-NaN entries of values."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"count": 0, "mean": np.nan, "std": np.nan, "min": np.nan, "q1": np.nan,
+                "median": np.nan, "q3": np.nan, "max": np.nan}
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {"count": len(values), "mean": values.mean(), "std": values.std(ddof=1) if len(values) > 1 else 0.0,
+            "min": values.min(), "q1": q1, "median": median, "q3": q3, "max": values.max()}
+
+
+def summary_table(labels, prepared):
+    """One row of statistics per label, metric and direction (All, Fwd, Rev)."""
+    rows = []
+    for metric in STORE_METRICS:
+        for label, values in zip(labels, prepared["metrics"][metric]):
+            fwd, rev = split_fwd_rev(values)
+            for direction, vals in (("All", values), ("Fwd", fwd), ("Rev", rev)):
+                row = {"label": label, "metric": metric, "direction": direction}
+                row.update(describe(vals))
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _curve_table(store, curves, names):
+    # label, pixel (1-based, -1 if unknown) and direction of every curve in a per-curve result,
+    # followed by the given result columns; ordered by file
+    order = store.curve_order()
+    row = curves["row"][order]
+    known = row >= 0
+    table = pd.DataFrame({
+        "label": [store.filenames[i] for i in curves["file_index"][order]],
+        "pixel": np.where(known, store.pixel[row] + 1, -1),
+        "direction": [DIRECTIONS[store.direction[r]] if r >= 0 else "" for r in row],
+    })
+    for name in names:
+        table[name] = curves[name][order]
+    return table
+
+
+def iv_parameter_table(store, light_intensity=100.0, active_area=None):
+    """One row per I-V curve with the parameters computed from the curve (see MeasurementStore.iv_metrics)."""
+    return _curve_table(store, store.iv_metrics(light_intensity, active_area), IV_PARAMETERS)
+
+
+def diode_fit_table(store, temperature=298.15, max_workers=None):
+    """One row per I-V curve with the fitted single-diode parameters (see MeasurementStore.diode_fit)."""
+    return _curve_table(store, store.diode_fit(temperature, max_workers), DIODE_PARAMETERS)
@@ -0,0 +1,1057 @@
+"""
+SuSi GUI
+--------
+The Tk window of the SuSi Analysis Tool, started by SuSi_analysis_tool.py.
+
+It lives in its own module so that the script itself imports no tkinter:
+worker processes started with spawn or forkserver (the default on Windows,
+macOS and, from Python 3.14, Linux) re-import the script, and would
+otherwise need a Tk installation on a headless machine.
+"""
+
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import threading
+import queue
+import traceback
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from susi_parser import parse_susi_file, default_workers
+from susi_cache import parse_susi_file_cached, DEFAULT_CACHE_DIR
+from susi_engine import (default_filter_options, load_measurements, prepare_multiple_plot_data,
+                         diode_fit_table, complete_groups, MeasurementStore, STORE_METRICS)
+from susi_plotting import (default_plot_options, create_figure, layout_axes, plot_single, plot_multiple,
+                           update_multiple, extend_multiple)
+from susi_watch import FolderWatcher
+from susi_index import (DEFAULT_INDEX_PATH, connect as connect_index, archive_files, update_index, find_files,
+                        parse_header_condition)
+from susi_campaign import Campaign
+
+class SuSiAnalysisTool:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("SuSi Analysis Tool")
+        self.root.state("zoomed")  # Fullscreen
+
+        # --- Default Plot Options & Filter Options ---
+        self.plot_options = default_plot_options()
+        self.filter_options = default_filter_options()
+
+        # --- Additional toggle via checkbox for separate forward/reverse ---
+        self.sep_fwd_rev_var = tk.BooleanVar(value=False)
+        # Extra hysteresis index panel next to the I-V curves
+        self.hysteresis_var = tk.BooleanVar(value=False)
+
+        # Number of worker processes used when loading multiple files
+        self.workers_var = tk.IntVar(value=default_workers())
+        # Parsed files are cached on disk and reused while the file is unchanged
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.compact_iv_var = tk.BooleanVar(value=False)  # I-V data in float32
+        self.cache_dir = DEFAULT_CACHE_DIR
+        # Archive index (SQLite) used by "Load from Index"
+        self.index_path = DEFAULT_INDEX_PATH
+
+        # Background task state (loading / plot preparation in a worker thread)
+        self.task_thread = None
+        self.task_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+
+        # Watch-folder mode: new or modified files in the folder are added as they arrive
+        self.watcher = None
+        self.watch_pending = []  # settled files not loaded yet
+        self.watch_interval = 2000  # ms between polls
+        self.watch_after_id = None
+
+        # For grouping files in multiple-file mode:
+        self.group_mapping = {}  # Maps group name to list of file indices; {} shows the files ungrouped
+        self.group_history = [{}]  # Groupings applied since loading, for undo/redo
+        self.group_history_index = 0  # Position of group_mapping in group_history
+
+        ##########################################
+        # Build the GUI
+        ##########################################
+        self.setup_gui()
+
+        ##########################################
+        # Data Holders
+        ##########################################
+        self.data = None  # Single file mode: dict with keys "filename", "performance", "iv", "params"
+        self.multi_data = []  # Multiple files: list of such dicts, as loaded (grouping never changes them)
+        self.file_store = None  # Columnar metrics of multi_data, or of data in single mode (MeasurementStore)
+        self.store = None  # What is plotted: file_store, or a grouped view of it (see set_grouping)
+        # Artists of the comparison plot currently shown and the store it was drawn from,
+        # so a filter change can update the plot in place.
+        self.plot_state = None
+        self.plot_state_store = None
+
+    def setup_gui(self):
+        # --- Top Controls Frame ---
+        self.top_frame = tk.Frame(self.root)
+        self.top_frame.pack(fill="x", padx=10, pady=5)
+        self.load_button = tk.Button(self.top_frame, text="Load Data File", command=self.load_file)
+        self.load_button.pack(side=tk.LEFT, padx=5)
+        self.load_multi_button = tk.Button(self.top_frame, text="Load Multiple Files", command=self.load_multiple_files)
+        self.load_multi_button.pack(side=tk.LEFT, padx=5)
+        self.group_button = tk.Button(self.top_frame, text="Group Files", command=self.open_group_window)
+        self.group_button.pack(side=tk.LEFT, padx=5)
+        self.undo_group_button = tk.Button(self.top_frame, text="Undo Grouping", command=self.undo_grouping,
+                                           state="disabled")
+        self.undo_group_button.pack(side=tk.LEFT, padx=5)
+        self.redo_group_button = tk.Button(self.top_frame, text="Redo Grouping", command=self.redo_grouping,
+                                           state="disabled")
+        self.redo_group_button.pack(side=tk.LEFT, padx=5)
+        self.index_button = tk.Button(self.top_frame, text="Load from Index", command=self.open_index_window)
+        self.index_button.pack(side=tk.LEFT, padx=5)
+        self.campaign_button = tk.Button(self.top_frame, text="Open Campaign", command=self.open_campaign)
+        self.campaign_button.pack(side=tk.LEFT, padx=5)
+        self.watch_button = tk.Button(self.top_frame, text="Watch Folder", command=self.toggle_watch_folder)
+        self.watch_button.pack(side=tk.LEFT, padx=5)
+        tk.Label(self.top_frame, text="Workers:").pack(side=tk.LEFT, padx=(10, 2))
+        self.workers_spinbox = tk.Spinbox(self.top_frame, from_=1, to=max(default_workers(), 64),
+                                          textvariable=self.workers_var, width=4)
+        self.workers_spinbox.pack(side=tk.LEFT, padx=5)
+        self.cache_checkbox = tk.Checkbutton(self.top_frame, text="Use Cache", variable=self.use_cache_var)
+        self.cache_checkbox.pack(side=tk.LEFT, padx=5)
+        self.compact_iv_checkbox = tk.Checkbutton(self.top_frame, text="Compact I-V (float32)",
+                                                  variable=self.compact_iv_var)
+        self.compact_iv_checkbox.pack(side=tk.LEFT, padx=5)
+        self.file_path_var = tk.StringVar()
+        self.file_path_entry = tk.Entry(self.top_frame, textvariable=self.file_path_var, state="readonly", width=80)
+        self.file_path_entry.pack(side=tk.LEFT, padx=5)
+
+        # --- Plot Title & Custom Labels ---
+        self.title_frame = tk.Frame(self.root)
+        self.title_frame.pack(fill="x", padx=10, pady=5)
+        tk.Label(self.title_frame, text="Plot Title:").pack(side=tk.LEFT, padx=5)
+        self.plot_title_var = tk.StringVar()
+        self.plot_title_entry = tk.Entry(self.title_frame, textvariable=self.plot_title_var, width=50)
+        self.plot_title_entry.pack(side=tk.LEFT, padx=5)
+        tk.Label(self.title_frame, text="File Labels (comma-separated):").pack(side=tk.LEFT, padx=5)
+        self.custom_labels_var = tk.StringVar()
+        self.custom_labels_entry = tk.Entry(self.title_frame, textvariable=self.custom_labels_var, width=50)
+        self.custom_labels_entry.pack(side=tk.LEFT, padx=5)
+
+        # --- Buttons Frame ---
+        self.button_frame = tk.Frame(self.root)
+        self.button_frame.pack(fill="x", padx=10, pady=5)
+        self.generate_button = tk.Button(self.button_frame, text="Generate Plots", command=self.generate_plots)
+        self.generate_button.pack(side=tk.LEFT, padx=5)
+        self.save_button = tk.Button(self.button_frame, text="Save Plots", command=self.save_plots)
+        self.save_button.pack(side=tk.LEFT, padx=5)
+        self.customize_button = tk.Button(self.button_frame, text="Customize Plot", command=self.open_customization_window)
+        self.customize_button.pack(side=tk.LEFT, padx=5)
+        self.filter_button = tk.Button(self.button_frame, text="Filter Settings", command=self.open_filter_window)
+        self.filter_button.pack(side=tk.LEFT, padx=5)
+        # --- Moved Separate Fwd/Rev checkbox next to Filter Settings ---
+        self.sep_checkbox = tk.Checkbutton(self.button_frame, text="Separate Fwd/Rev", variable=self.sep_fwd_rev_var)
+        self.sep_checkbox.pack(side=tk.LEFT, padx=10)
+        self.hysteresis_checkbox = tk.Checkbutton(self.button_frame, text="Hysteresis Panel",
+                                                  variable=self.hysteresis_var, command=self.toggle_hysteresis_panel)
+        self.hysteresis_checkbox.pack(side=tk.LEFT, padx=10)
+        self.diode_fit_button = tk.Button(self.button_frame, text="Fit Diode Model", command=self.fit_diode_model)
+        self.diode_fit_button.pack(side=tk.LEFT, padx=5)
+        # --- Progress bar and Cancel button for background tasks ---
+        self.cancel_button = tk.Button(self.button_frame, text="Cancel", command=self.cancel_task, state="disabled")
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.progress_bar = ttk.Progressbar(self.button_frame, orient="horizontal", length=250, mode="determinate")
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        self.progress_text_var = tk.StringVar()
+        tk.Label(self.button_frame, textvariable=self.progress_text_var).pack(side=tk.RIGHT, padx=5)
+
+        # --- Measurement Parameters Frame (Scrollable) ---
+        self.params_frame_container = tk.Frame(self.root)
+        self.params_frame_container.pack(fill="x", padx=10, pady=5)
+        self.params_canvas = tk.Canvas(self.params_frame_container, height=120)
+        self.params_scrollbar = tk.Scrollbar(self.params_frame_container, orient="vertical", command=self.params_canvas.yview)
+        self.params_canvas.configure(yscrollcommand=self.params_scrollbar.set)
+        self.params_canvas.pack(side=tk.LEFT, fill="x", expand=True)
+        self.params_scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.params_inner_frame = tk.Frame(self.params_canvas)
+        self.params_canvas.create_window((0, 0), window=self.params_inner_frame, anchor="nw")
+        self.params_inner_frame.bind("<Configure>", lambda e: self.params_canvas.configure(scrollregion=self.params_canvas.bbox("all")))
+        self.params_text = tk.Text(self.params_inner_frame, height=7, wrap=tk.WORD, state="disabled", relief="flat")
+        self.params_text.pack(fill="x")
+
+        # --- Plot Frame (Scrollable) ---
+        self.plot_frame_container = tk.Frame(self.root)
+        self.plot_canvas = tk.Canvas(self.plot_frame_container)
+        self.plot_scrollbar = tk.Scrollbar(self.plot_frame_container, orient="vertical", command=self.plot_canvas.yview)
+        self.plot_canvas.configure(yscrollcommand=self.plot_scrollbar.set)
+        self.plot_canvas.pack(side=tk.LEFT, fill="both", expand=True)
+        self.plot_scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.plot_inner_frame = tk.Frame(self.plot_canvas)
+        self.plot_canvas.create_window((0, 0), window=self.plot_inner_frame, anchor="nw")
+        self.plot_inner_frame.bind("<Configure>", lambda e: self.plot_canvas.configure(scrollregion=self.plot_canvas.bbox("all")))
+
+        # --- Matplotlib Figure Setup ---
+        self.fig, self.axes = create_figure(self.plot_options)
+        self.set_axes_aliases()
+        self.canvas = FigureCanvasTkAgg(self.fig, self.plot_inner_frame)
+        self.canvas.get_tk_widget().pack(padx=10, pady=10, fill="both", expand=True)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.plot_inner_frame)
+        self.toolbar.update()
+        self.toolbar.pack(side=tk.TOP, fill="x")
+
+        # --- Mouse Wheel Bindings ---
+        self.plot_canvas.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.params_canvas.bind_all("<MouseWheel>", self.on_mousewheel)
+
+    def set_axes_aliases(self):
+        self.ax_jsc = self.axes["Jsc"]
+        self.ax_voc = self.axes["Voc"]
+        self.ax_eff = self.axes["Efficiency"]
+        self.ax_ff = self.axes["Fill Factor"]
+        self.ax_iv = self.axes["IV"]
+
+    def toggle_hysteresis_panel(self):
+        self.plot_options["show_hysteresis"] = self.hysteresis_var.get()
+        self.axes = layout_axes(self.fig, self.plot_options)
+        self.set_axes_aliases()
+        self.plot_state = None
+        if self.multi_data or self.data is not None:
+            self.generate_plots()
+
+    def run_in_background(self, work, on_done, total, text):
+        """Run work(report, cancel_event) in a worker thread.
+
+        work may call report(done, total) to advance the progress bar; its return
+        value is handed to on_done on the Tk main thread. Only one task runs at a time.
+        """
+        if self.task_thread is not None and self.task_thread.is_alive():
+            messagebox.showinfo("Busy", "Please wait for the current task to finish or cancel it.")
+            return False
+        self.cancel_event = threading.Event()
+        self.task_queue = queue.Queue()
+        self.progress_bar.config(maximum=max(total, 1), value=0)
+        self.progress_text_var.set(text)
+        self.cancel_button.config(state="normal")
+        self.set_task_controls_state("disabled")
+
+        def report(done, count):
+            self.task_queue.put(("progress", done, count))
+
+        def runner():
+            try:
+                result = work(report, self.cancel_event)
+                self.task_queue.put(("done", result))
+            except Exception as ex:
+                traceback.print_exc()
+                self.task_queue.put(("error", ex))
+
+        self.task_thread = threading.Thread(target=runner, daemon=True)
+        self.task_thread.start()
+        self.root.after(50, self.poll_task, on_done)
+        return True
+
+    def poll_task(self, on_done):
+        # Drain messages from the worker thread; reschedule until it reports back.
+        while True:
+            try:
+                msg = self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == "progress":
+                self.progress_bar.config(maximum=max(msg[2], 1), value=msg[1])
+            else:
+                self.finish_task()
+                if msg[0] == "done":
+                    on_done(msg[1])
+                else:
+                    messagebox.showerror("Error", f"Background task failed: {msg[1]}")
+                return
+        self.root.after(100, self.poll_task, on_done)
+
+    def finish_task(self):
+        self.task_thread = None
+        self.progress_text_var.set("")
+        self.progress_bar.config(value=0)
+        self.cancel_button.config(state="disabled")
+        self.set_task_controls_state("normal")
+
+    def cancel_task(self):
+        self.cancel_event.set()
+        self.progress_text_var.set("Cancelling...")
+        self.cancel_button.config(state="disabled")
+
+    def set_task_controls_state(self, state):
+        # Everything that changes the data, the filters or the plot layout waits for the task
+        for button in (self.load_button, self.load_multi_button, self.index_button, self.campaign_button,
+                       self.group_button, self.generate_button, self.diode_fit_button, self.customize_button,
+                       self.filter_button, self.sep_checkbox, self.hysteresis_checkbox):
+            button.config(state=state)
+        self.update_group_history_buttons(state == "normal")
+
+    def on_mousewheel(self, event):
+        delta = event.delta if hasattr(event, 'delta') else (120 if event.num == 4 else -120)
+        if event.widget in (self.plot_canvas, self.plot_inner_frame):
+            self.plot_canvas.yview_scroll(-1 * int(delta / 120), "units")
+        elif event.widget in (self.params_canvas, self.params_inner_frame):
+            self.params_canvas.yview_scroll(-1 * int(delta / 120), "units")
+
+    def open_customization_window(self):
+        win = tk.Toplevel(self.root)
+        win.title("Customize Plot")
+        win.geometry("850x700")
+        main_frame = tk.Frame(win, padx=10, pady=10)
+        main_frame.pack(fill="both", expand=True)
+        canvas = tk.Canvas(main_frame)
+        scrollbar = tk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
+        scroll_frame = tk.Frame(canvas)
+        scroll_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        canvas.pack(side="left", fill="both", expand=True)
+        entries = {}
+        section_frame = tk.LabelFrame(scroll_frame, text="General Plot Options", padx=10, pady=10)
+        section_frame.grid(row=0, column=0, columnspan=8, sticky="ew", padx=5, pady=10)
+        general_opts = [
+            ("Axis Label Fontsize:", "axis_label_fontsize", self.plot_options["axis_label_fontsize"]),
+            ("Tick Label Fontsize:", "tick_label_fontsize", self.plot_options["tick_label_fontsize"]),
+            ("Marker Size:", "marker_size", self.plot_options["marker_size"]),
+            ("Separate Fwd/Rev (True/False):", "separate_forward_reverse", self.plot_options["separate_forward_reverse"]),
+            ("Horizontal Spacing (wspace):", "x_spacing", self.plot_options["x_spacing"]),
+            ("Vertical Spacing (hspace):", "y_spacing", self.plot_options["y_spacing"])
+        ]
+        for i, (label_text, key, default_value) in enumerate(general_opts):
+            row = i // 3
+            col = (i % 3) * 2
+            tk.Label(section_frame, text=label_text, anchor="e").grid(row=row, column=col, sticky="e", padx=5, pady=5)
+            entry = tk.Entry(section_frame, width=15)
+            entry.insert(0, str(default_value))
+            entry.grid(row=row, column=col + 1, sticky="w", padx=5, pady=5)
+            entries[(key, None)] = entry
+        perf_frame = tk.LabelFrame(scroll_frame, text="Performance Options", padx=10, pady=10)
+        perf_frame.grid(row=1, column=0, columnspan=8, sticky="ew", padx=5, pady=10)
+        perf_params = ["Jsc", "Voc", "Efficiency", "Fill Factor"]
+        perf_opts = [("Metric:", "metric"),
+                     ("Title:", "title"),
+                     ("X-Label:", "xlabel"),
+                     ("Y-Label:", "ylabel"),
+                     ("Fwd Color:", "fcolor"),
+                     ("Rev Color:", "rcolor"),
+                     ("Fwd Marker:", "fmarker"),
+                     ("Rev Marker:", "rmarker")]
+        empty_label = tk.Label(perf_frame, text="", height=1)
+        empty_label.grid(row=0, column=0)
+        for j, param in enumerate(perf_params):
+            header = tk.Label(perf_frame, text=param, font=("Arial", 9, "bold"))
+            header.grid(row=1, column=j + 1, padx=5, pady=(0, 10), sticky="s")
+        # Y-label and colors belong to the metric a panel shows (as plot_multiple reads them), the rest to the panel
+        metric_options = {"ylabel": "y_axis_labels", "fcolor": "forward_color", "rcolor": "reverse_color"}
+        shown_metrics = {param: self.plot_options["panel_metrics"].get(param, param) for param in perf_params}
+        shown_values = {}
+        for i, (opt_text, subkey) in enumerate(perf_opts):
+            row = i + 2
+            tk.Label(perf_frame, text=opt_text, anchor="e").grid(row=row, column=0, sticky="e", padx=(5, 10), pady=5)
+            for j, param in enumerate(perf_params):
+                default = ""
+                if subkey == "metric":
+                    default = self.plot_options["panel_metrics"].get(param, param)
+                elif subkey == "title":
+                    default = self.plot_options["subplot_titles"].get(param, "")
+                elif subkey == "xlabel":
+                    default = self.plot_options["x_axis_labels"].get(param, "")
+                elif subkey in metric_options:
+                    default = self.plot_options[metric_options[subkey]].get(shown_metrics[param], "")
+                    shown_values[(param, subkey)] = str(default)
+                elif subkey in ["fmarker", "rmarker"]:
+                    default = self.plot_options["forward_marker"] if subkey == "fmarker" else self.plot_options["reverse_marker"]
+                entry = tk.Entry(perf_frame, width=15)
+                entry.insert(0, str(default))
+                entry.grid(row=row, column=j + 1, padx=5, pady=5, sticky="w")
+                entries[(param, subkey)] = entry
+        iv_frame = tk.LabelFrame(scroll_frame, text="I-V Options", padx=10, pady=10)
+        iv_frame.grid(row=2, column=0, columnspan=8, sticky="ew", padx=5, pady=10)
+        iv_opts = [("Subplot Title:", "title"),
+                   ("X-Axis Label:", "xlabel"),
+                   ("Y-Axis Label:", "ylabel"),
+                   ("Fwd Line Style:", "f_linestyle"),
+                   ("Rev Line Style:", "r_linestyle"),
+                   ("Fwd Marker:", "f_marker"),
+                   ("Rev Marker:", "r_marker")]
+        for i, (opt_text, subkey) in enumerate(iv_opts):
+            tk.Label(iv_frame, text=f"I-V {opt_text}", anchor="e").grid(row=i, column=0, sticky="e", padx=5, pady=5)
+            default = ""
+            if subkey == "title":
+                default = self.plot_options["subplot_titles"].get("IV", "")
+            elif subkey == "xlabel":
+                default = self.plot_options["x_axis_labels"].get("IV", "Voltage [V]")
+            elif subkey == "ylabel":
+                default = self.plot_options["y_axis_labels"].get("IV", "J [mA/cm²]")
+            elif subkey in ["f_linestyle", "r_linestyle"]:
+                default = self.plot_options["iv_line_style"].get("Fwd" if subkey == "f_linestyle" else "Rev",
+                                                                 "-" if subkey == "f_linestyle" else ":")
+            elif subkey in ["f_marker", "r_marker"]:
+                default = self.plot_options["iv_marker"].get("Fwd" if subkey == "f_marker" else "Rev",
+                                                             "o" if subkey == "f_marker" else "s")
+            entry = tk.Entry(iv_frame, width=15)
+            entry.insert(0, str(default))
+            entry.grid(row=i, column=1, sticky="w", padx=5, pady=5)
+            entries[("IV", subkey)] = entry
+        button_frame = tk.Frame(scroll_frame)
+        button_frame.grid(row=3, column=0, columnspan=8, pady=15)
+        def apply_custom():
+            try:
+                self.plot_options["axis_label_fontsize"] = int(entries[("axis_label_fontsize", None)].get())
+                self.plot_options["tick_label_fontsize"] = int(entries[("tick_label_fontsize", None)].get())
+                self.plot_options["marker_size"] = int(entries[("marker_size", None)].get())
+                sep_val = entries[("separate_forward_reverse", None)].get().strip().lower()
+                self.plot_options["separate_forward_reverse"] = (sep_val == "true")
+                self.plot_options["x_spacing"] = float(entries[("x_spacing", None)].get())
+                self.plot_options["y_spacing"] = float(entries[("y_spacing", None)].get())
+                for param in ["Jsc", "Voc", "Efficiency", "Fill Factor"]:
+                    metric = entries[(param, "metric")].get().strip()
+                    if metric not in STORE_METRICS:
+                        raise ValueError(f"Unknown metric '{metric}', choose from: {', '.join(STORE_METRICS)}")
+                    self.plot_options["panel_metrics"][param] = metric
+                    self.plot_options["subplot_titles"][param] = entries[(param, "title")].get().strip()
+                    self.plot_options["x_axis_labels"][param] = entries[(param, "xlabel")].get().strip()
+                    for subkey, option in metric_options.items():
+                        value = entries[(param, subkey)].get().strip()
+                        # A newly chosen metric keeps its own label and colors unless they were edited here
+                        if metric == shown_metrics[param] or value != shown_values[(param, subkey)]:
+                            self.plot_options[option][metric] = value
+                    self.plot_options["forward_marker"] = entries[(param, "fmarker")].get().strip()
+                    self.plot_options["reverse_marker"] = entries[(param, "rmarker")].get().strip()
+                self.plot_options["subplot_titles"]["IV"] = entries[("IV", "title")].get().strip()
+                self.plot_options["x_axis_labels"]["IV"] = entries[("IV", "xlabel")].get().strip()
+                self.plot_options["y_axis_labels"]["IV"] = entries[("IV", "ylabel")].get().strip()
+                self.plot_options["iv_line_style"]["Fwd"] = entries[("IV", "f_linestyle")].get().strip()
+                self.plot_options["iv_line_style"]["Rev"] = entries[("IV", "r_linestyle")].get().strip()
+                self.plot_options["iv_marker"]["Fwd"] = entries[("IV", "f_marker")].get().strip()
+                self.plot_options["iv_marker"]["Rev"] = entries[("IV", "r_marker")].get().strip()
+                self.fig.subplots_adjust(wspace=self.plot_options["x_spacing"],
+                                         hspace=self.plot_options["y_spacing"])
+                messagebox.showinfo("Success", "Customization updated.")
+                win.destroy()
+            except Exception as ex:
+                messagebox.showerror("Error", f"Invalid input: {ex}")
+        tk.Button(button_frame, text="Apply", command=apply_custom, width=10).pack()
+        win.focus_force()
+
+    def open_group_window(self):
+        if not self.multi_data:
+            messagebox.showinfo("Info", "Load multiple files first.")
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Group and Order Files")
+        win.geometry("550x400")
+
+        tk.Label(win, text="Rename and order files into groups (same name → combined):", wraplength=520) \
+            .pack(padx=10, pady=10)
+        frame = tk.Frame(win)
+        frame.pack(padx=10, pady=10, fill="both", expand=True)
+
+        # Start from the current grouping and order
+        group_of_file = {}
+        position = {}
+        for name, indices in self.group_mapping.items():
+            for i in indices:
+                group_of_file[i] = name
+                position[i] = len(position)
+
+        name_vars = []
+        order_vars = []
+        for idx, entry in enumerate(self.multi_data):
+            row = tk.Frame(frame)
+            row.grid(row=idx, column=0, sticky="w", pady=2)
+
+            # Show original filename
+            tk.Label(row, text=f"File {idx + 1}: {entry['filename']}").pack(side="left")
+
+            # Editable group name
+            nv = tk.StringVar(value=group_of_file.get(idx, entry['filename']))
+            name_vars.append(nv)
+            tk.Entry(row, textvariable=nv, width=20).pack(side="left", padx=5)
+
+            # Spinbox for explicit ordering
+            ov = tk.IntVar(value=position.get(idx, idx) + 1)
+            order_vars.append(ov)
+            tk.Spinbox(row, from_=1, to=len(self.multi_data), textvariable=ov, width=4).pack(side="left")
+
+        def apply_grouping():
+            # 1) Collect and sort by order
+            items = [(order_vars[i].get(), name_vars[i].get().strip(), i)
+                     for i in range(len(self.multi_data))]
+            items.sort(key=lambda x: x[0])
+
+            # 2) Group identical names (in sorted order)
+            from collections import OrderedDict
+            grouped = OrderedDict()
+            for _, name, orig_idx in items:
+                grouped.setdefault(name, []).append(orig_idx)
+
+            # 3) Plot a grouped view of the loaded files; they stay as they are
+            self.set_grouping(dict(grouped))
+
+            messagebox.showinfo("Success", "Grouping and ordering applied.")
+            win.destroy()
+            self.generate_plots()
+
+        def remove_grouping():
+            self.set_grouping({})
+            win.destroy()
+            self.generate_plots()
+
+        button_row = tk.Frame(win)
+        button_row.pack(pady=10)
+        tk.Button(button_row, text="Apply Grouping", command=apply_grouping).pack(side="left", padx=5)
+        tk.Button(button_row, text="Remove Grouping", command=remove_grouping).pack(side="left", padx=5)
+        win.focus_force()
+
+    def set_grouping(self, mapping, record=True):
+        """Plot the loaded files grouped by mapping (group name -> file indices), or ungrouped for {}.
+
+        The grouped store is an index view over file_store, so (re)grouping
+        neither copies nor reloads any data. With record, the grouping is
+        added to the undo history (dropping what could be redone).
+        """
+        if mapping:
+            # Files loaded after the grouping was made (watch mode) are added to it
+            mapping = complete_groups(mapping, self.file_store.filenames)
+        if record:
+            del self.group_history[self.group_history_index + 1:]
+            self.group_history.append(mapping)
+            self.group_history_index = len(self.group_history) - 1
+        self.group_mapping = mapping
+        self.store = self.file_store.grouped(mapping) if mapping else self.file_store
+        # Sync the custom labels string
+        self.custom_labels_var.set(",".join(self.store.filenames))
+        self.update_group_history_buttons()
+
+    def reset_group_history(self):
+        # New data: the file indices of earlier groupings no longer apply
+        self.group_mapping = {}
+        self.group_history = [{}]
+        self.group_history_index = 0
+        self.update_group_history_buttons()
+
+    def undo_grouping(self):
+        if self.group_history_index > 0 and self.multi_data:
+            self.group_history_index -= 1
+            self.set_grouping(self.group_history[self.group_history_index], record=False)
+            self.generate_plots()
+
+    def redo_grouping(self):
+        if self.group_history_index < len(self.group_history) - 1 and self.multi_data:
+            self.group_history_index += 1
+            self.set_grouping(self.group_history[self.group_history_index], record=False)
+            self.generate_plots()
+
+    def update_group_history_buttons(self, enabled=None):
+        if enabled is None:
+            enabled = self.task_thread is None
+        can_undo = enabled and self.group_history_index > 0
+        can_redo = enabled and self.group_history_index < len(self.group_history) - 1
+        self.undo_group_button.config(state="normal" if can_undo else "disabled")
+        self.redo_group_button.config(state="normal" if can_redo else "disabled")
+
+    def load_file(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
+        if not file_path:
+            return
+        self.stop_watching()
+        # Clear multiple file data
+        self.multi_data = []
+        self.file_path_var.set(file_path)
+        try:
+            if self.use_cache_var.get():
+                entry = parse_susi_file_cached(file_path, self.cache_dir)
+            else:
+                entry = parse_susi_file(file_path)
+            self.params_text.config(state="normal")
+            self.params_text.delete("1.0", tk.END)
+            self.params_text.insert(tk.END, entry["params"])
+            self.params_text.config(state="disabled")
+            self.plot_title_var.set(entry["filename"])
+            print(f"Loaded performance data with {entry['performance'].shape[1]} columns.")
+            self.data = entry
+            self.file_store = self.store = MeasurementStore([entry])
+            self.store.drop_tables()
+            self.reset_group_history()
+            print("Single file loaded successfully!")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load file: {e}")
+
+    def load_multiple_files(self):
+        file_paths = filedialog.askopenfilenames(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
+        if not file_paths:
+            return
+        self.stop_watching()
+        try:
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = default_workers()
+        cache_dir = self.cache_dir if self.use_cache_var.get() else None
+        iv_dtype = "float32" if self.compact_iv_var.get() else None
+
+        def work(report, cancel_event):
+            measurements, errors = load_measurements(file_paths, max_workers=workers, cache_dir=cache_dir,
+                                                     progress=report, cancel_event=cancel_event,
+                                                     iv_dtype=iv_dtype)
+            store = MeasurementStore(measurements)
+            store.drop_tables()  # the store holds the I-V curves from here on
+            return measurements, errors, store
+
+        self.run_in_background(work, self.on_files_loaded, total=len(file_paths),
+                               text=f"Loading {len(file_paths)} files...")
+
+    def open_index_window(self):
+        win = tk.Toplevel(self.root)
+        win.title("Load from Index")
+        fields = [("Index database:", self.index_path),
+                  ("Update from archive folder (optional):", ""),
+                  ("File name (glob, e.g. dev_*):", ""),
+                  ("Device (glob):", ""),
+                  ("Measured from (YYYY-MM-DD):", ""),
+                  ("Measured until (YYYY-MM-DD):", ""),
+                  ("Header (KEY=VALUE or KEY=MIN,MAX; ...):", "")]
+        metrics = ["Efficiency", "Jsc", "Voc", "Fill Factor"]
+        entries = []
+        for row, (text, value) in enumerate(fields + [(f"{name} range (min,max):", "") for name in metrics]):
+            tk.Label(win, text=text).grid(row=row, column=0, sticky="w", padx=5, pady=5)
+            entry = tk.Entry(win, width=40)
+            entry.insert(0, value)
+            entry.grid(row=row, column=1, padx=5, pady=5)
+            entries.append(entry)
+
+        def load_matching():
+            try:
+                values = [entry.get().strip() for entry in entries]
+                db_path, archive, filename, device, since, until, header = values[:len(fields)]
+                header = [parse_header_condition(part) for part in header.split(";") if part.strip()]
+                ranges = {}
+                for name, text in zip(metrics, values[len(fields):]):
+                    if text:
+                        parts = text.split(",")
+                        if len(parts) != 2:
+                            raise ValueError(f"Invalid range for {name}")
+                        ranges[name] = (float(parts[0]), float(parts[1]))
+                if not db_path:
+                    raise ValueError("No index database given")
+            except Exception as ex:
+                messagebox.showerror("Error", f"Invalid input: {ex}")
+                return
+            self.index_path = db_path
+            win.destroy()
+            self.load_from_index(db_path, archive, dict(filename=filename or None, device=device or None,
+                                                        date_range=(since or None, until or None), header=header,
+                                                        metrics=ranges))
+
+        tk.Button(win, text="Load Matching Files", command=load_matching).grid(
+            row=len(entries), column=0, columnspan=2, pady=10)
+
+    def load_from_index(self, db_path, archive, query):
+        """Load the files of the index at db_path that match query (keyword arguments of find_files).
+
+        With an archive folder, the index is brought up to date first. Only
+        the matching files are parsed (or taken from the cache).
+        """
+        self.stop_watching()
+        try:
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = default_workers()
+        cache_dir = self.cache_dir if self.use_cache_var.get() else None
+        iv_dtype = "float32" if self.compact_iv_var.get() else None
+
+        def work(report, cancel_event):
+            # The connection is opened here: SQLite connections belong to the thread that made them
+            connection = connect_index(db_path)
+            try:
+                errors = []
+                if archive:
+                    _, _, errors = update_index(connection, archive_files([archive]), max_workers=workers,
+                                                cache_dir=cache_dir, progress=report, cancel_event=cancel_event)
+                file_paths = find_files(connection, **query)
+            finally:
+                connection.close()
+            print(f"{len(file_paths)} files match the query.")
+            measurements, load_errors = load_measurements(file_paths, max_workers=workers, cache_dir=cache_dir,
+                                                          progress=report, cancel_event=cancel_event,
+                                                          iv_dtype=iv_dtype)
+            store = MeasurementStore(measurements)
+            store.drop_tables()
+            return measurements, errors + load_errors, store
+
+        self.file_path_var.set(db_path)
+        self.run_in_background(work, self.on_files_loaded, total=1, text="Querying index...")
+
+    def open_campaign(self):
+        directory = filedialog.askdirectory()
+        if not directory:
+            return
+        try:
+            campaign = Campaign(directory)
+        except (OSError, ValueError) as ex:
+            messagebox.showerror("Error", f"Could not open campaign: {ex}")
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Open Campaign")
+        tk.Label(win, text=f"{campaign.n_files} files in {directory}").grid(row=0, column=0, columnspan=2, pady=5)
+        tk.Label(win, text="File name (glob, e.g. dev_*):").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        entry = tk.Entry(win, width=40)
+        entry.grid(row=1, column=1, padx=5, pady=5)
+
+        def load_selected():
+            file_ids = campaign.select(entry.get().strip() or None)
+            if len(file_ids) == 0:
+                messagebox.showerror("Error", "No campaign file matches the file name.")
+                return
+            win.destroy()
+            self.load_from_campaign(campaign, file_ids)
+
+        tk.Button(win, text="Load Selected Files", command=load_selected).grid(row=2, column=0, columnspan=2, pady=10)
+
+    def load_from_campaign(self, campaign, file_ids):
+        """Load the selected files of a campaign; only their slices of the campaign arrays are read."""
+        self.stop_watching()
+
+        def work(report, cancel_event):
+            # The comparison plots need no performance or I-V tables, only the store's arrays
+            store = campaign.store(file_ids)
+            return store.measurements, [], store
+
+        self.file_path_var.set(campaign.path)
+        self.run_in_background(work, self.on_files_loaded, total=1, text=f"Loading {len(file_ids)} campaign files...")
+
+    def on_files_loaded(self, result):
+        measurements, errors, store = result
+        self.multi_data = measurements
+        self.file_store = self.store = store
+        self.reset_group_history()  # reset grouping on new load
+        all_params = []
+        for entry in self.multi_data:
+            all_params.append(f"{entry['filename']}:\n" + entry["params"])
+            print(f"Loaded file: {entry['filename']}")
+        if self.cancel_event.is_set():
+            print(f"Loading cancelled, {len(self.multi_data)} files loaded.")
+        if errors:
+            messagebox.showerror("Error", "Failed to load:\n" + "\n".join(f"{path}: {error}"
+                                                                          for path, error in errors))
+        if self.multi_data:
+            self.plot_title_var.set("Comparison Plot")
+            default_labels = [d["filename"] for d in self.multi_data]
+            self.custom_labels_var.set(",".join(default_labels))
+            combined_params = "\n\n---\n\n".join(all_params)
+            self.params_text.config(state="normal")
+            self.params_text.delete("1.0", tk.END)
+            self.params_text.insert(tk.END, combined_params)
+            self.params_text.config(state="disabled")
+            print("Multiple files loaded successfully!")
+
+    def toggle_watch_folder(self):
+        if self.watcher is not None:
+            self.stop_watching()
+            return
+        directory = filedialog.askdirectory()
+        if not directory:
+            return
+        self.watcher = FolderWatcher(directory)
+        self.watch_pending = []
+        # Start a new comparison from the files in the folder
+        self.data = None
+        self.multi_data = []
+        self.file_store = self.store = MeasurementStore([])
+        self.plot_state = None
+        self.reset_group_history()
+        self.file_path_var.set(directory)
+        self.plot_title_var.set("Comparison Plot")
+        self.custom_labels_var.set("")
+        self.params_text.config(state="normal")
+        self.params_text.delete("1.0", tk.END)
+        self.params_text.config(state="disabled")
+        self.watch_button.config(text="Stop Watching")
+        print(f"Watching {directory} for new measurements...")
+        self.poll_watch_folder()
+
+    def stop_watching(self):
+        if self.watcher is None:
+            return
+        if self.watch_after_id is not None:
+            self.root.after_cancel(self.watch_after_id)
+            self.watch_after_id = None
+        print(f"Stopped watching {self.watcher.directory}.")
+        self.watcher = None
+        self.watch_pending = []
+        self.watch_button.config(text="Watch Folder")
+
+    def poll_watch_folder(self):
+        # Runs every watch_interval ms while watching; loads settled files whenever no other task runs.
+        self.watch_after_id = None
+        if self.watcher is None:
+            return
+        try:
+            self.watch_pending.extend(path for path in self.watcher.poll() if path not in self.watch_pending)
+        except OSError as e:
+            print(f"Could not scan {self.watcher.directory}: {e}")
+        if self.watch_pending and (self.task_thread is None or not self.task_thread.is_alive()):
+            self.load_watched_files()
+        self.watch_after_id = self.root.after(self.watch_interval, self.poll_watch_folder)
+
+    def load_watched_files(self):
+        paths, self.watch_pending = self.watch_pending, []
+        watcher = self.watcher
+        old_store = self.store
+        file_store = self.file_store
+        mapping = self.group_mapping
+        known = {name: i for i, name in enumerate(file_store.filenames)}
+        filter_options = dict(self.filter_options)
+        try:
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = default_workers()
+        cache_dir = self.cache_dir if self.use_cache_var.get() else None
+        iv_dtype = "float32" if self.compact_iv_var.get() else None
+
+        def work(report, cancel_event):
+            # Only the new files are parsed; their store is appended to the current one
+            measurements, errors = load_measurements(paths, max_workers=workers, cache_dir=cache_dir,
+                                                     progress=report, cancel_event=cancel_event,
+                                                     iv_dtype=iv_dtype)
+            added = [m for m in measurements if m["filename"] not in known]
+            modified = [m for m in measurements if m["filename"] in known]
+            loaded = MeasurementStore(modified + added)
+            loaded.drop_tables()
+            new_file_store = MeasurementStore.concat([file_store, loaded])
+            if modified:
+                # Modified files take the place of their old version
+                n = file_store.n_files
+                order = list(range(n))
+                for k, m in enumerate(modified):
+                    order[known[m["filename"]]] = n + k
+                new_file_store = new_file_store.select(order + list(range(n + len(modified), n + loaded.n_files)))
+            # New files join the group of their name, or become groups of their own at the end
+            new_mapping = complete_groups(mapping, new_file_store.filenames) if mapping else {}
+            new_store = new_file_store.grouped(new_mapping) if new_mapping else new_file_store
+            prepared = prepare_multiple_plot_data(new_store, filter_options, None, cancel_event)
+            return (measurements, errors, old_store, (new_file_store, new_mapping, new_store), prepared, bool(modified),
+                    (watcher, paths))
+
+        self.run_in_background(work, self.on_watched_files_loaded, total=len(paths),
+                               text=f"Loading {len(paths)} new files...")
+
+    def on_watched_files_loaded(self, result):
+        measurements, errors, old_store, (file_store, mapping, store), prepared, modified, (watcher, paths) = result
+        for path, error in errors:
+            # Reported on the console only: a broken file would otherwise pop up a dialog on every scan
+            print(f"Failed to load {path}: {error}")
+        if prepared is None or self.store is not old_store:  # cancelled, or the data was regrouped meanwhile
+            # Have the watcher report the files again, so the next scan loads them onto the current data
+            watcher.forget(paths)
+            return
+        n_old = old_store.n_files
+        state = self.plot_state
+        in_place = self.plot_state_current()  # checked against the store the plot was drawn from
+        self.multi_data = file_store.measurements
+        self.file_store = file_store
+        self.group_mapping = self.group_history[self.group_history_index] = mapping
+        self.store = store
+        self.params_text.config(state="normal")
+        for entry in measurements:
+            print(f"Loaded file: {entry['filename']}")
+            self.params_text.insert(tk.END, ("\n\n---\n\n" if self.params_text.get("1.0", "end-1c") else "")
+                                    + f"{entry['filename']}:\n" + entry["params"])
+        self.params_text.config(state="disabled")
+        if not self.multi_data:
+            return
+
+        custom = self.custom_labels_var.get().strip()
+        labels = [lab.strip() for lab in custom.split(",")] if custom else []
+        if len(labels) != n_old:
+            labels = list(store.filenames)
+        else:
+            labels += store.filenames[n_old:]
+            self.custom_labels_var.set(",".join(labels))
+
+        if modified:
+            in_place = in_place and state["labels"] == labels and update_multiple(state, prepared)
+        else:
+            in_place = (in_place and state["labels"] == labels[:len(state["labels"])]
+                        and extend_multiple(state, prepared, labels, self.plot_options))
+        if in_place:
+            self.plot_state_store = store
+            self.show_plots()
+        else:
+            self.draw_plots_multiple(labels, prepared)
+
+    def open_filter_window(self):
+        win = tk.Toplevel(self.root)
+        win.title("Filter Settings")
+        def create_filter_row(param, default_range, row):
+            tk.Label(win, text=f"{param} range (min,max):").grid(row=row, column=0, sticky="w", padx=5, pady=5)
+            entry = tk.Entry(win, width=20)
+            entry.insert(0, f"{default_range[0]},{default_range[1]}")
+            entry.grid(row=row, column=1, padx=5, pady=5)
+            return entry
+        entry_jsc = create_filter_row("Jsc", self.filter_options["Jsc"], 0)
+        entry_voc = create_filter_row("Voc", self.filter_options["Voc"], 1)
+        entry_eff = create_filter_row("Efficiency", self.filter_options["Efficiency"], 2)
+        entry_ff = create_filter_row("Fill Factor", self.filter_options["Fill Factor"], 3)
+        entry_rs = create_filter_row("Rs", self.filter_options["Rs"], 4)
+        entry_rsh = create_filter_row("Rsh", self.filter_options["Rsh"], 5)
+        entry_hi = create_filter_row("HI", self.filter_options["HI"], 6)
+        entry_hi_area = create_filter_row("HI area", self.filter_options["HI area"], 7)
+        entry_volt = create_filter_row("Voltage", self.filter_options["Voltage"], 8)
+        def apply_filters():
+            try:
+                for param, entry in zip(["Jsc", "Voc", "Efficiency", "Fill Factor", "Rs", "Rsh", "HI", "HI area",
+                                         "Voltage"],
+                                        [entry_jsc, entry_voc, entry_eff, entry_ff, entry_rs, entry_rsh, entry_hi,
+                                         entry_hi_area, entry_volt]):
+                    parts = entry.get().split(',')
+                    if len(parts) != 2:
+                        raise ValueError(f"Invalid range for {param}")
+                    self.filter_options[param] = (float(parts[0]), float(parts[1]))
+                messagebox.showinfo("Success", "Filter settings updated.")
+                win.destroy()
+                self.refresh_filtered_plots()
+            except Exception as ex:
+                messagebox.showerror("Error", f"Invalid input: {ex}")
+        tk.Button(win, text="Apply Filters", command=apply_filters).grid(row=9, column=0, columnspan=2, pady=10)
+
+    def generate_plots_single(self):
+        plot_single(self.fig, self.axes, self.data, self.plot_options, self.filter_options,
+                    self.separate_fwd_rev(), self.store)
+
+    def generate_plots_multiple(self):
+        try:
+            # Extract custom labels or use filenames
+            custom = self.custom_labels_var.get().strip()
+            if custom:
+                labels = [lab.strip() for lab in custom.split(",")]
+                if len(labels) != self.store.n_files:
+                    messagebox.showerror("Error", "Number of custom labels must match number of files!")
+                    return
+            else:
+                labels = list(self.store.filenames)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error generating multiple plots: {str(e)}")
+            traceback.print_exc()
+            return
+        store = self.store
+        filter_options = dict(self.filter_options)
+
+        def work(report, cancel_event):
+            return prepare_multiple_plot_data(store, filter_options, report, cancel_event)
+
+        self.run_in_background(work,
+                               lambda prepared: self.draw_plots_multiple(labels, prepared),
+                               total=store.n_files, text="Preparing plots...")
+
+    def draw_plots_multiple(self, labels, prepared):
+        if prepared is None:  # cancelled
+            return
+        try:
+            self.plot_state = plot_multiple(self.fig, self.axes, labels, prepared, self.plot_options,
+                                            self.separate_fwd_rev(), self.plot_title_var.get())
+            self.plot_state_store = self.store
+            self.show_plots()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error generating multiple plots: {str(e)}")
+            traceback.print_exc()
+
+    def plot_state_current(self):
+        """True if the comparison plot shown was drawn from self.store with the current plot settings."""
+        state = self.plot_state
+        return (state is not None and self.store is self.plot_state_store
+                and state["separate"] == self.separate_fwd_rev() and state["title"] == self.plot_title_var.get()
+                and all(self.plot_options["panel_metrics"].get(panel, metric) == metric
+                        for panel, metric in state["panel_metrics"].items()))
+
+    def refresh_filtered_plots(self):
+        """Redraw after a filter change, updating the shown comparison plot in place when possible."""
+        state = self.plot_state
+        custom = self.custom_labels_var.get().strip()
+        if self.multi_data and custom:
+            labels = [lab.strip() for lab in custom.split(",")]
+        else:
+            labels = list(self.store.filenames) if self.multi_data else []
+        if not self.multi_data or not self.plot_state_current() or state["labels"] != labels:
+            self.generate_plots()
+            return
+        store = self.store
+        filter_options = dict(self.filter_options)
+
+        def work(report, cancel_event):
+            return prepare_multiple_plot_data(store, filter_options, report, cancel_event)
+
+        def on_done(prepared):
+            if prepared is None:  # cancelled
+                return
+            if update_multiple(state, prepared):
+                self.show_plots()
+            else:
+                self.draw_plots_multiple(labels, prepared)
+
+        self.run_in_background(work, on_done, total=store.n_files, text="Filtering...")
+
+    def save_plots(self):
+        plot_title = self.fig._suptitle.get_text() if self.fig._suptitle else "Untitled_Plot"
+        default_filename = plot_title + "_plots.png"
+        file_path = filedialog.asksaveasfilename(defaultextension=".png",
+                                                 filetypes=[("PNG files", "*.png"), ("All Files", "*.*")],
+                                                 initialfile=default_filename)
+        if file_path:
+            try:
+                self.fig.savefig(file_path, dpi=300, bbox_inches="tight")
+                print(f"Plots saved as: {file_path}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save plots: {e}")
+
+    def fit_diode_model(self):
+        if self.store is None or not (self.multi_data or self.data is not None):
+            messagebox.showerror("Error", "No data loaded!")
+            return
+        store = self.store
+        try:
+            workers = int(self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = default_workers()
+
+        def work(report, cancel_event):
+            return store.diode_fit(max_workers=workers, progress=report, cancel_event=cancel_event)
+
+        def on_done(fitted):
+            if fitted is None:  # cancelled
+                return
+            table = diode_fit_table(store)
+            print(table.groupby("label", sort=False)[["Iph", "I0", "n", "Rs", "Rsh"]].median().to_string())
+            file_path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                                     filetypes=[("CSV files", "*.csv"), ("All Files", "*.*")],
+                                                     initialfile="diode_fit.csv")
+            if file_path:
+                try:
+                    table.to_csv(file_path, index=False)
+                    print(f"Diode fit saved as: {file_path}")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Failed to save diode fit: {e}")
+
+        self.run_in_background(work, on_done, total=store.n_rows, text="Fitting diode model...")
+
+    def generate_plots_dispatch(self):
+        if self.multi_data:
+            # Data preparation runs in the background; show_plots is called once drawn.
+            self.generate_plots_multiple()
+        elif self.data is not None:
+            self.generate_plots_single()
+            self.show_plots()
+        else:
+            messagebox.showerror("Error", "No data loaded!")
+
+    def separate_fwd_rev(self):
+        return self.plot_options["separate_forward_reverse"] or self.sep_fwd_rev_var.get()
+
+    def show_plots(self):
+        if not self.plot_frame_container.winfo_ismapped():
+            self.plot_frame_container.pack(fill="both", expand=True, padx=10, pady=5)
+        self.canvas.draw()
+
+    def generate_plots(self):
+        self.generate_plots_dispatch()
+
+
+def main():
+    root = tk.Tk()
+    SuSiAnalysisTool(root)
+    root.mainloop()
@@ -0,0 +1,329 @@
+"""
+SuSi Archive Index
+------------------
+Keeps a local SQLite database of a measurement archive, so it can be
+searched without opening the files, e.g. all devices with a PCE above 20 %
+measured last month:
+
+    python SuSi_analysis_tool.py index --archive /data/susi --db susi.sqlite
+    python SuSi_analysis_tool.py index --db susi.sqlite \
+        --where "efficiency > 20 AND measured_at >= '2025-03-01'"
+
+Tables:
+  files   one row per file: path, filename, device, measured_at (ISO text,
+          from the header date or else the file time), active_area, and the
+          mtime/size it was indexed at,
+  header  every "key: value" line of the parameter header, with the value
+          as text, and as number and unit where it is a plain numeric value
+          (see susi_parser.parse_header_value; NULL otherwise),
+  pixels  one row per pixel sweep with the metrics of MeasurementStore.
+
+Files are only re-read when their modification time or size changed since
+they were indexed.
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from susi_parser import load_files_parallel, default_workers, header_field, parse_date
+from susi_cache import DEFAULT_CACHE_DIR
+from susi_engine import MeasurementStore, DIRECTIONS, area_value
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".susi_index.sqlite")
+# Column of each store metric in the pixels table
+METRIC_COLUMNS = {"Jsc": "jsc", "Voc": "voc", "Efficiency": "efficiency", "Fill Factor": "ff", "Rs": "rs",
+                  "Rsh": "rsh", "HI": "hi", "HI area": "hi_area"}
+# Header keys (lower case) that name the device, in order of preference
+DEVICE_KEYS = ["device", "device name", "sample", "sample name", "name"]
+DATE_KEYS = ["date", "measurement date", "time", "date/time"]
+# Bump when the tables or the parsed header values change; an index with another version is rebuilt from scratch
+INDEX_VERSION = 3
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    filename TEXT NOT NULL,
+    device TEXT,
+    measured_at TEXT,
+    active_area REAL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS header (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    number REAL,
+    unit TEXT
+);
+CREATE TABLE IF NOT EXISTS pixels (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    pixel INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    {", ".join(f"{column} REAL" for column in METRIC_COLUMNS.values())}
+);
+CREATE INDEX IF NOT EXISTS files_measured_at ON files(measured_at);
+CREATE INDEX IF NOT EXISTS files_device ON files(device);
+CREATE INDEX IF NOT EXISTS header_key_number ON header(key, number);
+CREATE INDEX IF NOT EXISTS header_key_value ON header(key, value);
+CREATE INDEX IF NOT EXISTS pixels_file ON pixels(file_id);
+{"".join(f"CREATE INDEX IF NOT EXISTS pixels_{column} ON pixels({column});" for column in METRIC_COLUMNS.values())}
+"""
+
+
+def connect(db_path=DEFAULT_INDEX_PATH):
+    """Open (and if needed create) the index database."""
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        connection.executescript("DROP TABLE IF EXISTS pixels; DROP TABLE IF EXISTS header; DROP TABLE IF EXISTS files;")
+        connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def archive_files(roots, pattern="*.txt"):
+    """All measurement files below the given directories (recursively) or matching the given paths/globs."""
+    file_paths = []
+    for root in roots:
+        if os.path.isdir(root):
+            file_paths.extend(sorted(glob.glob(os.path.join(root, "**", pattern), recursive=True)))
+        else:
+            file_paths.extend(sorted(glob.glob(root)) or [root])
+    return [os.path.abspath(path) for path in file_paths]
+
+
+def _iso(date):
+    return date.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _header_value(header, keys, kind):
+    # First value of the given type among the keys (lower case) of a typed header
+    values = {key.lower(): value for key, value in reversed(list(header.items()))}
+    return next((values[key] for key in keys if isinstance(values.get(key), kind) and values[key] != ""), None)
+
+
+def _file_row(file_path, entry, stat):
+    header = entry["header"]
+    measured_at = _header_value(header, DATE_KEYS, datetime) or datetime.fromtimestamp(stat.st_mtime)
+    area = area_value(entry.get("active_area"))
+    return (file_path, entry["filename"], _header_value(header, DEVICE_KEYS, str) or entry["filename"],
+            _iso(measured_at), None if np.isnan(area) else area, stat.st_mtime_ns, stat.st_size)
+
+
+def _header_rows(file_id, entry):
+    # (file_id, key, value text, number, unit) of every header line; number only for plain numeric values
+    rows = []
+    for line in entry["params"].splitlines():
+        field = header_field(line)
+        if field is not None:
+            key, text = field
+            value = entry["header"].get(key)
+            rows.append((file_id, key, text, value if isinstance(value, float) else None,
+                         entry["header_units"].get(key)))
+    return rows
+
+
+def _sql_value(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _insert_chunk(connection, chunk):
+    # chunk: [(file_path, entry, stat)]; replaces whatever was indexed for these paths
+    store = MeasurementStore([entry for _, entry, _ in chunk])
+    metric_columns = ", ".join(METRIC_COLUMNS.values())
+    placeholders = ", ".join("?" * (3 + len(METRIC_COLUMNS)))
+    with connection:
+        for i, (file_path, entry, stat) in enumerate(chunk):
+            connection.execute("DELETE FROM files WHERE path = ?", (file_path,))
+            file_id = connection.execute(
+                "INSERT INTO files (path, filename, device, measured_at, active_area, mtime_ns, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", _file_row(file_path, entry, stat)).lastrowid
+            connection.executemany("INSERT INTO header (file_id, key, value, number, unit) VALUES (?, ?, ?, ?, ?)",
+                                   _header_rows(file_id, entry))
+            rows = range(store.offsets[i], store.offsets[i + 1])
+            connection.executemany(
+                f"INSERT INTO pixels (file_id, pixel, direction, {metric_columns}) VALUES ({placeholders})",
+                [(file_id, int(store.pixel[r]) + 1, DIRECTIONS[store.direction[r]])
+                 + tuple(_sql_value(store.metrics[name][r]) for name in METRIC_COLUMNS) for r in rows])
+
+
+def update_index(connection, file_paths, max_workers=None, cache_dir=None, chunk_size=500, progress=None,
+                 cancel_event=None):
+    """Index new or changed files and drop files that no longer exist; returns (indexed, removed, errors).
+
+    file_paths should be absolute (see archive_files). Files are parsed in
+    a process pool, chunk_size files at a time, and each chunk is written
+    in one transaction. errors is a list of (file_path, exception); files
+    without a performance table are skipped like in load_measurements.
+    """
+    known = {path: (mtime_ns, size) for path, mtime_ns, size
+             in connection.execute("SELECT path, mtime_ns, size FROM files")}
+    stats = {}
+    for path in file_paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            continue
+    stale = [path for path, st in stats.items() if known.get(path) != (st.st_mtime_ns, st.st_size)]
+    removed = [path for path in known if path not in stats and not os.path.exists(path)]
+    with connection:
+        connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+
+    indexed = 0
+    errors = []
+    for start in range(0, len(stale), chunk_size):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        chunk = []
+        for file_path, entry, error in load_files_parallel(stale[start:start + chunk_size], max_workers=max_workers,
+                                                           cancel_event=cancel_event, cache_dir=cache_dir):
+            if isinstance(error, pd.errors.EmptyDataError):
+                continue
+            if error is not None:
+                errors.append((file_path, error))
+                continue
+            chunk.append((file_path, entry, stats[file_path]))
+        _insert_chunk(connection, chunk)
+        indexed += len(chunk)
+        if progress is not None:
+            progress(min(start + chunk_size, len(stale)), len(stale))
+    return indexed, removed, errors
+
+
+def query_index(connection, where="1", params=()):
+    """Pixel rows joined with their file, filtered by an SQL WHERE clause over both tables.
+
+    Columns of files (path, filename, device, measured_at, active_area) and
+    of pixels (pixel, direction, jsc, voc, efficiency, ff, rs, rsh, hi,
+    hi_area) can be used, e.g. where="efficiency > ? AND measured_at >= ?".
+    Header values are reachable through a subquery on the header table.
+    """
+    columns = ", ".join(f"p.{column}" for column in METRIC_COLUMNS.values())
+    return pd.read_sql_query(
+        f"SELECT f.path, f.filename, f.device, f.measured_at, f.active_area, p.pixel, p.direction, {columns} "
+        f"FROM pixels p JOIN files f ON f.id = p.file_id WHERE {where} ORDER BY f.measured_at, f.path, p.rowid",
+        connection, params=params)
+
+
+def _date_bound(text, end):
+    # "2025-03-01" or any header date format -> ISO text; a bare end date includes that whole day
+    if not text:
+        return None
+    date = parse_date(text)
+    if date is None:
+        raise ValueError(f"Unknown date format '{text}'")
+    iso = _iso(date)
+    if end and len(text.strip()) <= 10:
+        iso = iso[:10] + " 23:59:59"
+    return iso
+
+
+def find_files(connection, filename=None, device=None, date_range=None, header=(), metrics=None):
+    """Paths of the indexed files matching all given conditions, oldest measurement first.
+
+    filename is a glob on the file name (without extension) or on the full
+    path; device a glob on the device name. date_range is (from, to), either
+    may be None; a date without a time includes the whole day. header is a
+    list of (key, condition) where the condition is a text value or a
+    (min, max) range for numeric values. metrics maps store metric names to
+    (min, max): a file matches if one of its pixel sweeps lies within all of
+    them. Only the index is read; no measurement file is opened.
+    """
+    conditions, params = [], []
+    if filename:
+        conditions.append("(f.filename GLOB ? OR f.path GLOB ?)")
+        params += [filename, filename]
+    if device:
+        conditions.append("f.device GLOB ?")
+        params.append(device)
+    if date_range:
+        for bound, op, end in zip(date_range, (">=", "<="), (False, True)):
+            iso = _date_bound(bound, end)
+            if iso is not None:
+                conditions.append(f"f.measured_at {op} ?")
+                params.append(iso)
+    for key, condition in header:
+        if isinstance(condition, tuple):
+            conditions.append("EXISTS (SELECT 1 FROM header h WHERE h.file_id = f.id AND h.key = ? "
+                              "AND h.number BETWEEN ? AND ?)")
+            params += [key, condition[0], condition[1]]
+        else:
+            conditions.append("EXISTS (SELECT 1 FROM header h WHERE h.file_id = f.id AND h.key = ? AND h.value = ?)")
+            params += [key, condition]
+    if metrics:
+        ranges = []
+        for name, (low, high) in metrics.items():
+            if name not in METRIC_COLUMNS:
+                raise ValueError(f"Unknown metric '{name}', choose from: {', '.join(METRIC_COLUMNS)}")
+            ranges.append(f"p.{METRIC_COLUMNS[name]} BETWEEN ? AND ?")
+            params += [low, high]
+        conditions.append(f"EXISTS (SELECT 1 FROM pixels p WHERE p.file_id = f.id AND {' AND '.join(ranges)})")
+    where = " AND ".join(conditions) or "1"
+    return [path for path, in connection.execute(f"SELECT f.path FROM files f WHERE {where} "
+                                                 "ORDER BY f.measured_at, f.path", params)]
+
+
+def parse_header_condition(text):
+    """ "Scan rate=100" -> ("Scan rate", "100"), "Light intensity=90,110" -> ("Light intensity", (90.0, 110.0))."""
+    key, sep, value = text.partition("=")
+    if not sep or not key.strip():
+        raise ValueError(f"Invalid header condition '{text}', expected KEY=VALUE or KEY=MIN,MAX")
+    parts = value.split(",")
+    if len(parts) == 2:
+        try:
+            return key.strip(), (float(parts[0]), float(parts[1]))
+        except ValueError:
+            pass
+    return key.strip(), value.strip()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="SuSi_analysis_tool.py index",
+                                     description="Index a SuSi measurement archive in SQLite and query it.")
+    parser.add_argument("--db", default=DEFAULT_INDEX_PATH, help="index database (default: ~/.susi_index.sqlite)")
+    parser.add_argument("--archive", nargs="+", default=[],
+                        help="directories (searched recursively), files or glob patterns to index")
+    parser.add_argument("--where", default=None,
+                        help="print the pixel sweeps matching this SQL condition, e.g. \"efficiency > 20 AND "
+                             "measured_at >= '2025-03-01'\"")
+    parser.add_argument("--out", default=None, help="write the --where result to this CSV file instead")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="parser processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="parse cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the files")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    connection = connect(args.db)
+    try:
+        if args.archive:
+            file_paths = archive_files(args.archive)
+            indexed, removed, errors = update_index(connection, file_paths, max_workers=args.workers,
+                                                    cache_dir=None if args.no_cache else args.cache_dir)
+            for file_path, error in errors:
+                print(f"Failed to load {file_path}: {error}", file=sys.stderr)
+            print(f"Indexed {indexed} new or changed files, removed {len(removed)}; "
+                  f"{len(file_paths)} files in the archive.")
+        if args.where:
+            result = query_index(connection, args.where)
+            if args.out:
+                result.to_csv(args.out, index=False)
+                print(f"{len(result)} matching pixel sweeps saved as: {args.out}")
+            else:
+                print(result.to_csv(index=False), end="")
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+SuSi I-V Analysis
+-----------------
+Derives the solar cell parameters from the measured I-V curves instead of
+trusting the performance table written by the instrument.
+
+All functions work on many curves at once: voltage and current density are
+2D arrays with one curve per row, padded with NaN where a curve has fewer
+points than the longest one. Curves measured on the same voltages can share
+one voltage row: pass the distinct voltage rows as voltage and, as axis, the
+row of every curve. Units follow the SuSi files: V, mA/cm² and
+mW/cm², so powers come out in mW/cm² and FF and efficiency in %.
+"""
+
+import numpy as np
+
+# Parameters returned by iv_parameters, in column order for exports.
+IV_PARAMETERS = ["Jsc", "Voc", "Pmax", "Vmpp", "Jmpp", "FF", "Efficiency"]
+
+
+def value_at_zero(s, t):
+    """Interpolate t where s first changes sign along each row; NaN for rows where it never does."""
+    if s.shape[1] < 2:
+        return np.full(s.shape[0], np.nan)
+    s0, s1 = s[:, :-1], s[:, 1:]
+    t0, t1 = t[:, :-1], t[:, 1:]
+    crossing = (np.sign(s0) * np.sign(s1) <= 0) & (s0 != s1) & np.isfinite(t0) & np.isfinite(t1)
+    found = crossing.any(axis=1)
+    k = crossing.argmax(axis=1)
+    rows = np.arange(s.shape[0])
+    a, b = s0[rows, k], s1[rows, k]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = t0[rows, k] + (t1[rows, k] - t0[rows, k]) * (-a / (b - a))
+    result[~found] = np.nan
+    return result
+
+
+def curve_voltages(voltage, axis=None):
+    """The (curves x points) float voltage array, gathered from the shared voltage rows if axis is given."""
+    voltage = np.asarray(voltage, dtype=float)
+    return voltage if axis is None else voltage[axis]
+
+
+def iv_parameters(voltage, current, light_intensity=100.0, axis=None):
+    """Compute Jsc, Voc, Pmax, Vmpp, Jmpp, FF and efficiency of every curve.
+
+    voltage and current are (curves x points) arrays. Jsc and Voc are the
+    interpolated zero crossings; the sign of the current at 0 V decides which
+    quadrant holds the generated power, so both sign conventions work. Jsc,
+    Jmpp and Pmax are returned as positive magnitudes. light_intensity is the
+    incident power in mW/cm². Returns {parameter: array with one value per curve}.
+    """
+    voltage = curve_voltages(voltage, axis)
+    current = np.asarray(current, dtype=float)
+    jsc = value_at_zero(voltage, current)
+    voc = value_at_zero(current, voltage)
+    orientation = np.where(jsc < 0, -1.0, 1.0)
+
+    power = voltage * current * orientation[:, None]
+    power = np.where(np.isfinite(power) & (power >= 0), power, -np.inf)
+    k = power.argmax(axis=1)
+    rows = np.arange(power.shape[0])
+    pmax = power[rows, k]
+    valid = np.isfinite(pmax)
+    pmax = np.where(valid, pmax, np.nan)
+    vmpp = np.where(valid, voltage[rows, k], np.nan)
+    jmpp = np.where(valid, np.abs(current[rows, k]), np.nan)
+
+    jsc = np.abs(jsc)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ff = 100.0 * pmax / (jsc * np.abs(voc))
+    efficiency = 100.0 * pmax / light_intensity
+    return {"Jsc": jsc, "Voc": voc, "Pmax": pmax, "Vmpp": vmpp, "Jmpp": jmpp, "FF": ff,
+            "Efficiency": efficiency}
+
+
+def pad_curves(blocks):
+    """Stack [(voltage, currents)] blocks into NaN-padded voltage and current arrays.
+
+    Each block is a voltage vector with a (points x curves) current matrix
+    measured on it. Returns (voltage, current, block index of every curve):
+    voltage holds one row per block, shared by its curves (the block index
+    is the axis argument of the functions here), current one row per curve.
+    The arrays are float32 if all blocks are, float64 otherwise.
+    """
+    n_curves = sum(currents.shape[1] for _, currents in blocks)
+    n_points = max((len(v) for v, _ in blocks), default=0)
+    dtype = np.result_type(*[currents.dtype for _, currents in blocks], np.float32) if blocks else np.float64
+    voltage = np.full((len(blocks), n_points), np.nan, dtype=dtype)
+    current = np.full((n_curves, n_points), np.nan, dtype=dtype)
+    block_index = np.empty(n_curves, dtype=np.intp)
+    row = 0
+    for b, (v, currents) in enumerate(blocks):
+        n = currents.shape[1]
+        voltage[b, :len(v)] = v
+        current[row:row + n, :len(v)] = currents.T
+        block_index[row:row + n] = b
+        row += n
+    return voltage, current, block_index
+
+
+def local_slope(x, y, center, half_width):
+    """Least-squares slope dy/dx of every row over its points with |x - center| <= half_width.
+
+    center and half_width hold one value per row; rows with fewer than two
+    points in the window give NaN.
+    """
+    dx = x - center[:, None]
+    with np.errstate(invalid="ignore"):
+        window = (np.abs(dx) <= half_width[:, None]) & np.isfinite(y)
+    n = window.sum(axis=1)
+    dx = np.where(window, dx, 0.0)
+    y = np.where(window, y, 0.0)
+    sx, sy = dx.sum(axis=1), y.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * (dx * y).sum(axis=1) - sx * sy) / (n * (dx * dx).sum(axis=1) - sx * sx)
+    slope[n < 2] = np.nan
+    return slope
+
+
+def resistances(voltage, current, rs_window=0.05, rsh_window=0.1, axis=None):
+    """Series and shunt resistance of every curve in Ω·cm², from local linear fits.
+
+    Rs is the inverse slope of the curve around Voc, Rsh the inverse slope
+    around 0 V (i.e. at Jsc). The fit windows are given as fractions of Voc
+    on either side. Returns (rs, rsh); curves without a usable fit give NaN.
+    """
+    voltage = curve_voltages(voltage, axis)
+    current = np.asarray(current, dtype=float)
+    voc = np.abs(value_at_zero(current, voltage))
+    # A perfectly flat window (zero slope) has no finite resistance either
+    with np.errstate(divide="ignore"):
+        rs = 1000.0 / np.abs(local_slope(voltage, current, voc, rs_window * voc))
+        rsh = 1000.0 / np.abs(local_slope(voltage, current, np.zeros_like(voc), rsh_window * voc))
+    rs[~np.isfinite(rs)] = np.nan
+    rsh[~np.isfinite(rsh)] = np.nan
+    return rs, rsh
+
+
+def curve_area(voltage, current, axis=None):
+    """Area under every curve in its power quadrant (V >= 0, generated current), by the trapezoidal rule.
+
+    This is the integral of the current density from 0 V to Voc in mW/cm²;
+    points outside the quadrant count as zero.
+    """
+    voltage = curve_voltages(voltage, axis)
+    current = np.asarray(current, dtype=float)
+    orientation = np.where(value_at_zero(voltage, current) < 0, -1.0, 1.0)
+    j = np.clip(current * orientation[:, None], 0.0, None)
+    v = np.clip(voltage, 0.0, None)
+    segments = 0.5 * (j[:, 1:] + j[:, :-1]) * np.abs(v[:, 1:] - v[:, :-1])
+    return np.nansum(segments, axis=1)
+
+
+def hysteresis_index(fwd, rev):
+    """(rev - fwd) / rev for paired forward and reverse values, e.g. PCE or curve area."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        index = (np.asarray(rev, dtype=float) - fwd) / rev
+    index[~np.isfinite(index)] = np.nan
+    return index
@@ -0,0 +1,271 @@
+"""
+SuSi File Parser
+----------------
+Reads Sun Simulator (SuSi) .txt measurement files in a single pass.
+A file consists of three blocks:
+
+  1. the parameter header, up to and including the "Compliance" line,
+  2. the performance table (one row per metric, one column per pixel sweep),
+  3. the I-V table, which starts two lines after a line beginning with "Voltage".
+
+The file is opened once, the blocks are split while scanning the lines and
+each table is then parsed from memory. Header lines are turned into typed
+values during the same scan (see parse_header_value). Batches of files can be parsed in a
+process pool with load_files_parallel.
+"""
+
+import io
+import os
+import re
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+
+# A number, not followed by more digits or separators (as in dates, times and ids), then an optional unit
+# (words that do not start with a digit, so "mW/cm2" or "cm^2" count as units but "x 3 mm" does not)
+UNIT = r"([^\d\s]\S*(?:\s+[^\d\s]\S*)*)?"
+NUMBER_WITH_UNIT = re.compile(r"\s*([-+]?(?:\d+[.,]?\d*|[.,]\d+)(?:[eE][-+]?\d+)?)(?![\d.,:/_-])\s*" + UNIT + r"\s*$")
+# "-0.1 V to 1.2 V", "-0.1 ... 1.2 V": sweep ranges
+RANGE_WITH_UNIT = re.compile(r"\s*([-+]?(?:\d+[.,]?\d*|[.,]\d+)(?:[eE][-+]?\d+)?)\s*([^\d\s.,+-]*)\s*(?:to|\.\.\.|…|->)"
+                             r"\s*([-+]?(?:\d+[.,]?\d*|[.,]\d+)(?:[eE][-+]?\d+)?)\s*" + UNIT + r"\s*$",
+                             re.IGNORECASE)
+DATE_FORMATS = ["%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S",
+                "%Y-%m-%d", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y"]
+
+
+def _float(text):
+    return float(text.replace(",", "."))
+
+
+def parse_date(text):
+    """datetime of a header date in one of DATE_FORMATS, or None."""
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def header_field(line):
+    """(key, value text) of a "key: value" (or tab separated) header line, or None if it is not one."""
+    key, sep, value = line.partition(":")
+    if not sep:
+        key, sep, value = line.partition("\t")
+    key = key.strip()
+    return (key, value.strip()) if sep and key else None
+
+
+def parse_header_value(text):
+    """Typed value and unit of a header value: (float, unit) for "100 mW/cm²" or "1000 W/m2", ((start, stop),
+    unit) for a sweep range such as "-0.1 V to 1.2 V", (datetime, None) for a date and (text, None) otherwise.
+
+    The unit is None when there is none; decimal commas are accepted.
+    """
+    match = RANGE_WITH_UNIT.match(text)
+    if match:
+        return (_float(match.group(1)), _float(match.group(3))), match.group(4) or match.group(2) or None
+    match = NUMBER_WITH_UNIT.match(text)
+    if match:
+        return _float(match.group(1)), match.group(2) or None
+    date = parse_date(text) if text[:1].isdigit() else None
+    if date is not None:
+        return date, None
+    return text, None
+
+
+def _read_table(lines, label_column=False):
+    """Read a tab separated table into float columns; with label_column, column 0 (row labels) is left out.
+
+    The C engine reads the named columns straight into float64. Tables it
+    cannot read that way (text in a value column, broken quoting) are read
+    again with the python engine, the settings the GUI originally used, and
+    converted to numbers afterwards. Malformed rows are skipped either way.
+    """
+    text = "".join(lines)
+    header = next((line for line in lines if line.strip()), "")
+    names = header.rstrip("\r\n").split("\t")
+    # A trailing tab adds an unnamed, empty last column
+    while len(names) > 1 and not names[-1].strip():
+        names.pop()
+    usecols = list(range(1 if label_column else 0, len(names)))
+    try:
+        return pd.read_csv(io.StringIO(text), sep="\t", engine="c", usecols=usecols, dtype=np.float64,
+                           on_bad_lines="skip")
+    except (ValueError, pd.errors.ParserError):
+        pass
+    frame = pd.read_csv(io.StringIO(text), sep="\t", engine="python", on_bad_lines="skip")
+    if label_column and frame.shape[1] > 0:
+        frame = frame.drop(frame.columns[0], axis=1)
+    return frame.apply(pd.to_numeric, errors="coerce").astype(np.float64)
+
+
+def _drop_trailing_empty_columns(frame):
+    # Lines written with a trailing tab produce an unnamed, completely empty last column.
+    while frame.shape[1] > 0 and frame.iloc[:, -1].isna().all():
+        frame = frame.iloc[:, :-1]
+    return frame
+
+
+def split_blocks(lines):
+    """Split an iterable of raw lines into (parameters, performance lines, I-V lines, header).
+
+    header holds the typed header: {"values": {key: value}, "units": {key: unit},
+    "active_area": active area text or None}, see parse_header_value.
+    """
+    parameters = []
+    perf_lines = []
+    iv_lines = []
+    values = {}
+    units = {}
+    active_area = None
+    state = "params"
+    for line in lines:
+        if state == "params":
+            parameters.append(line.strip())
+            field = header_field(line)
+            if field is not None:
+                key, text = field
+                values[key], units[key] = parse_header_value(text)
+                if active_area is None and "active area" in key.lower():
+                    active_area = text
+            if "compliance" in line.lower():
+                state = "perf_gap"
+        elif state == "perf_gap":
+            # One separator line sits between the header and the performance table.
+            state = "perf"
+        elif state == "perf":
+            if line.strip().startswith("Voltage"):
+                state = "iv_gap"
+            else:
+                perf_lines.append(line)
+        elif state == "iv_gap":
+            # The I-V column header follows one line after the "Voltage" line.
+            state = "iv"
+        else:
+            iv_lines.append(line)
+    return parameters, perf_lines, iv_lines, {"values": values, "units": units, "active_area": active_area}
+
+
+def parse_performance(perf_lines):
+    if not any(line.strip() for line in perf_lines):
+        raise pd.errors.EmptyDataError("No performance table found")
+    # First column holds the row labels (J_sc, V_oc, ...)
+    perf = _read_table(perf_lines, label_column=True)
+    if perf.empty or len(perf.columns) == 0:
+        raise pd.errors.EmptyDataError("Performance table is empty")
+    perf = _drop_trailing_empty_columns(perf)
+    if perf.shape[1] % 2 != 0:
+        perf = perf.iloc[:, :-1]
+    return perf
+
+
+def parse_iv(iv_lines):
+    if not any(line.strip() for line in iv_lines):
+        return None
+    try:
+        iv = _read_table(iv_lines)
+    except pd.errors.EmptyDataError:
+        return None
+    if iv.empty:
+        return None
+    iv = _drop_trailing_empty_columns(iv)
+    # Column 0 is the voltage, followed by Fwd/Rev pairs per pixel.
+    if iv.shape[1] > 1 and (iv.shape[1] - 1) % 2 != 0:
+        iv = iv.iloc[:, :-1]
+    return iv
+
+
+def parse_susi_file(file_path):
+    """Parse one SuSi file and return a measurement dict.
+
+    The dict has the keys "filename", "performance", "iv", "active_area",
+    "params", "header" and "header_units", i.e. the layout the GUI keeps for
+    each loaded file. Raises pandas.errors.EmptyDataError if the file holds
+    no performance table.
+    """
+    with open(file_path, "r", encoding="latin1") as f:
+        parameters, perf_lines, iv_lines, header = split_blocks(f)
+    perf = parse_performance(perf_lines)
+    iv = parse_iv(iv_lines)
+    return {
+        "filename": os.path.splitext(os.path.basename(file_path))[0],
+        "performance": perf,
+        "iv": iv,
+        "active_area": header["active_area"],
+        "params": "\n".join(parameters),
+        "header": header["values"],
+        "header_units": header["units"],
+    }
+
+
+def parse_header(params):
+    """(values, units) of the typed header of a parameter block, e.g. one restored from the cache."""
+    header = split_blocks(params.splitlines(keepends=True) + ["compliance\n"])[3]
+    return header["values"], header["units"]
+
+
+def _parse_or_error(file_path, cache_dir=None, iv_dtype=None):
+    # Worker entry point: errors are returned instead of raised so one bad file
+    # does not abort the rest of the batch.
+    try:
+        if cache_dir:
+            from susi_cache import parse_susi_file_cached
+            entry = parse_susi_file_cached(file_path, cache_dir)
+        else:
+            entry = parse_susi_file(file_path)
+        if iv_dtype is not None and entry["iv"] is not None:
+            # Converted here, so only the compact table is sent back to the GUI process
+            entry["iv"] = entry["iv"].astype(iv_dtype)
+        return entry, None
+    except Exception as e:
+        return None, e
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def load_files_parallel(file_paths, max_workers=None, progress=None, cancel_event=None, cache_dir=None,
+                        iv_dtype=None):
+    """Parse several SuSi files, spreading the work over a process pool.
+
+    Returns a list of (file_path, entry, error) tuples in the order of
+    file_paths; exactly one of entry and error is None for each file.
+    progress(done, total) is called after every parsed file. Once
+    cancel_event is set, pending files are dropped and only the files parsed
+    so far are returned. With a cache_dir, unchanged files are taken from
+    the parse cache (see susi_cache). With iv_dtype (e.g. "float32" to halve
+    the memory of large sessions), the I-V tables are converted to it.
+    """
+    file_paths = list(file_paths)
+    total = len(file_paths)
+    if max_workers is None:
+        max_workers = default_workers()
+    max_workers = max(1, min(max_workers, total))
+    results = [None] * total
+    done = 0
+    if max_workers == 1:
+        for i, path in enumerate(file_paths):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            results[i] = _parse_or_error(path, cache_dir, iv_dtype)
+            done += 1
+            if progress is not None:
+                progress(done, total)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_parse_or_error, path, cache_dir, iv_dtype): i for i, path in enumerate(file_paths)}
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                results[futures[future]] = future.result()
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+    return [(path, result[0], result[1]) for path, result in zip(file_paths, results) if result is not None]
@@ -0,0 +1,620 @@
+"""
+SuSi Plotting
+-------------
+Draws the single-file and comparison plots onto a Matplotlib figure. Nothing
+in here depends on Tk, so the same code renders the GUI canvas and the
+headless batch output (see susi_batch).
+"""
+
+import numpy as np
+from matplotlib.figure import Figure
+import matplotlib.gridspec as gridspec
+import matplotlib.patches as mpatches
+import matplotlib.lines as mlines
+from matplotlib import cbook
+from matplotlib.path import Path
+from susi_engine import MeasurementStore, PIXEL_METRICS, DIRECTIONS
+
+
+def default_plot_options():
+    plot_options = {
+        "axis_label_fontsize": 14,
+        "tick_label_fontsize": 10,
+        "marker_size": 8,
+        "forward_marker": "o",
+        "reverse_marker": "s",
+        "forward_color": {"Jsc": "blue", "Voc": "red", "Efficiency": "green", "Fill Factor": "magenta",
+                          "Rs": "darkorange", "Rsh": "teal", "HI": "purple", "HI area": "sienna"},
+        "reverse_color": {"Jsc": "lightblue", "Voc": "tomato", "Efficiency": "limegreen", "Fill Factor": "violet",
+                          "Rs": "orange", "Rsh": "turquoise", "HI": "plum", "HI area": "peru"},
+        "separate_forward_reverse": False,  # also toggled by the checkbox
+        "show_hysteresis": False,  # extra hysteresis index panel, also toggled by the checkbox
+        "x_spacing": 0.2,    # horizontal spacing (wspace)
+        "y_spacing": 0.05    # vertical spacing (hspace)
+    }
+    # X-axis labels for performance subplots (customizable)
+    plot_options["x_axis_labels"] = {"Jsc": "", "Voc": "", "Efficiency": "", "Fill Factor": "", "IV": "Voltage [V]"}
+    # Subplot titles and Y-axis labels; if empty, no title is set.
+    plot_options["subplot_titles"] = {"Jsc": "", "Voc": "", "Efficiency": "", "Fill Factor": "", "IV": ""}
+    # Use LaTeX-style labels for J_sc and V_oc:
+    plot_options["y_axis_labels"] = {"Jsc": r"$J_{sc}$ [mA/cm²]", "Voc": r"$V_{oc}$ [V]",
+                                     "Efficiency": "Efficiency [%]", "Fill Factor": "Fill Factor [%]", "IV": "J [mA/cm²]",
+                                     "Rs": r"$R_s$ [Ω·cm²]", "Rsh": r"$R_{sh}$ [Ω·cm²]",
+                                     "HI": "Hysteresis Index (PCE)", "HI area": "Hysteresis Index (I-V area)"}
+    # Metric shown in each comparison panel (any store metric, e.g. "Rs" or "Rsh")
+    plot_options["panel_metrics"] = {"Jsc": "Jsc", "Voc": "Voc", "Efficiency": "Efficiency", "Fill Factor": "Fill Factor",
+                                     "Hysteresis": "HI"}
+    plot_options["iv_line_style"] = {"Fwd": "-", "Rev": ":"}
+    plot_options["iv_marker"] = {"Fwd": "o", "Rev": "s"}
+    return plot_options
+
+
+def create_figure(plot_options):
+    """Create the figure with the four metric axes and the I-V axis (keyed "IV")."""
+    fig = Figure(figsize=(18, 7.2))
+    return fig, layout_axes(fig, plot_options)
+
+
+def layout_axes(fig, plot_options):
+    """Clear fig and lay out its axes; with plot_options["show_hysteresis"] a "Hysteresis" axis is added."""
+    fig.clear()
+    if plot_options.get("show_hysteresis"):
+        gs = gridspec.GridSpec(2, 4, width_ratios=[1, 1, 1.5, 1], height_ratios=[1, 1])
+    else:
+        gs = gridspec.GridSpec(2, 3, width_ratios=[1, 1, 1.5], height_ratios=[1, 1])
+    axes = {
+        "Jsc": fig.add_subplot(gs[0, 0]),
+        "Voc": fig.add_subplot(gs[0, 1]),
+        "Efficiency": fig.add_subplot(gs[1, 0]),
+        "Fill Factor": fig.add_subplot(gs[1, 1]),
+        "IV": fig.add_subplot(gs[:, 2])
+    }
+    if plot_options.get("show_hysteresis"):
+        axes["Hysteresis"] = fig.add_subplot(gs[:, 3])
+    fig.subplots_adjust(left=0.07, right=0.98, top=0.92, bottom=0.12,
+                        wspace=plot_options["x_spacing"],
+                        hspace=plot_options["y_spacing"])
+    return axes
+
+
+def plot_single(fig, axes, data, plot_options, filter_options, separate, store=None):
+    """Plot the pixels and I-V curves of one measurement.
+
+    store is a MeasurementStore holding just this measurement; the metrics and
+    I-V curves are read from it, so data may have dropped its I-V table.
+    Passing the same store on every redraw reuses its cached filter masks.
+    """
+    ax_jsc, ax_voc, ax_eff, ax_ff, ax_iv = (axes["Jsc"], axes["Voc"], axes["Efficiency"],
+                                            axes["Fill Factor"], axes["IV"])
+    if store is None:
+        store = MeasurementStore([data])
+    # Values outside the filter ranges are already NaN here.
+    filtered = store.filtered(filter_options)
+    jsc, voc, ff, eff = (filtered["Jsc"], filtered["Voc"], filtered["Fill Factor"], filtered["Efficiency"])
+    num_columns = len(jsc)
+    if num_columns % 2 != 0:
+        num_columns -= 1
+        jsc, voc, ff, eff = jsc[:num_columns], voc[:num_columns], ff[:num_columns], eff[:num_columns]
+    if num_columns == 1:
+        x_positions = np.array([1])
+        pixel_labels = ["Pixel 1"]
+        jsc_fwd, voc_fwd, ff_fwd, eff_fwd = jsc[:1], voc[:1], ff[:1], eff[:1]
+    else:
+        if separate:
+            num_pixels = num_columns // 2
+            offset = 0.2
+            x_positions_fwd = np.array([i + 1 for i in range(num_pixels)])
+            x_positions_rev = x_positions_fwd + offset
+            major_ticks = (x_positions_fwd + x_positions_rev) / 2
+            pixel_labels = [f"P{i + 1}" for i in range(num_pixels)]
+            # If only one pixel exists, duplicate it.
+            if len(jsc) == 1:
+                jsc_fwd, jsc_rev = jsc, jsc
+                voc_fwd, voc_rev = voc, voc
+                ff_fwd, ff_rev = ff, ff
+                eff_fwd, eff_rev = eff, eff
+                x_positions_fwd = np.array([1])
+                x_positions_rev = np.array([1])
+                major_ticks = np.array([1])
+                pixel_labels = ["Pixel 1"]
+            else:
+                jsc_fwd = jsc[::2]
+                jsc_rev = jsc[1::2]
+                voc_fwd = voc[::2]
+                voc_rev = voc[1::2]
+                ff_fwd = ff[::2]
+                ff_rev = ff[1::2]
+                eff_fwd = eff[::2]
+                eff_rev = eff[1::2]
+        else:
+            num_pixels = num_columns // 2
+            x_positions = np.arange(1, num_pixels + 1)
+            pixel_labels = [f"Pixel {i}" for i in x_positions]
+            jsc_fwd, jsc_rev = jsc[::2], jsc[1::2]
+            voc_fwd, voc_rev = voc[::2], voc[1::2]
+            ff_fwd, ff_rev = ff[::2], ff[1::2]
+            eff_fwd, eff_rev = eff[::2], eff[1::2]
+
+    for ax in [ax_jsc, ax_voc, ax_eff, ax_ff, ax_iv]:
+        ax.clear()
+
+    ms = plot_options["marker_size"]
+
+    if separate:
+        ax_jsc.set_ylabel(plot_options["y_axis_labels"].get("Jsc"))
+        ax_jsc.set_xticks(major_ticks)
+        ax_jsc.set_xticklabels([])  # No tick labels for Jsc
+        ax_jsc.scatter(x_positions_fwd, jsc_fwd, marker=plot_options["forward_marker"],
+                       s=ms * 10, color=plot_options["forward_color"].get("Jsc", "blue"), label="Fwd")
+        ax_jsc.scatter(x_positions_rev, jsc_rev, marker=plot_options["reverse_marker"],
+                       s=ms * 10, color=plot_options["reverse_color"].get("Jsc", "red"), label="Rev")
+        ax_jsc.legend()
+        ax_jsc.grid(True)
+
+        ax_voc.set_ylabel(plot_options["y_axis_labels"].get("Voc"))
+        ax_voc.set_xticks(major_ticks)
+        ax_voc.set_xticklabels([])  # No tick labels for Voc
+        ax_voc.scatter(x_positions_fwd, voc_fwd, marker=plot_options["forward_marker"],
+                       s=ms * 10, color=plot_options["forward_color"].get("Voc", "blue"), label="Fwd")
+        ax_voc.scatter(x_positions_rev, voc_rev, marker=plot_options["reverse_marker"],
+                       s=ms * 10, color=plot_options["reverse_color"].get("Voc", "red"), label="Rev")
+        ax_voc.legend()
+        ax_voc.grid(True)
+
+        # For Efficiency and Fill Factor, plot boxplots for each file's forward and reverse data
+        ax_eff.set_ylabel(plot_options["y_axis_labels"].get("Efficiency"))
+        ax_eff.set_xticks(major_ticks)
+        ax_eff.set_xticklabels(pixel_labels, rotation=45, ha='right')
+
+        # Create proxy artists for the boxplot legend
+        box_fwd_patch = mpatches.Patch(color=plot_options["forward_color"].get("Efficiency", "blue"),
+                                       fill=False, label='Fwd')
+        box_rev_patch = mpatches.Patch(color=plot_options["reverse_color"].get("Efficiency", "red"),
+                                       fill=False, label='Rev')
+        orange_line = mlines.Line2D([], [], color='orange', marker='_', linestyle='None',
+                                    markersize=10, label='Median')
+
+        for i in range(len(eff_fwd)):
+            # Create arrays with non-NaN values only for boxplots
+            eff_fwd_filtered = eff_fwd[i:i + 1]
+            eff_fwd_filtered = eff_fwd_filtered[~np.isnan(eff_fwd_filtered)]
+            eff_rev_filtered = eff_rev[i:i + 1]
+            eff_rev_filtered = eff_rev_filtered[~np.isnan(eff_rev_filtered)]
+
+            # Only create boxplot if there are valid values
+            if len(eff_fwd_filtered) > 0:
+                ax_eff.boxplot([eff_fwd_filtered], positions=[x_positions_fwd[i]], widths=0.1,
+                               patch_artist=True,
+                               boxprops=dict(facecolor='none',
+                                             color=plot_options["forward_color"].get("Efficiency",
+                                                                                     "blue")),
+                               medianprops=dict(color='orange'))
+
+            if len(eff_rev_filtered) > 0:
+                ax_eff.boxplot([eff_rev_filtered], positions=[x_positions_rev[i]], widths=0.1,
+                               patch_artist=True,
+                               boxprops=dict(facecolor='none',
+                                             color=plot_options["reverse_color"].get("Efficiency",
+                                                                                     "red")),
+                               medianprops=dict(color='orange'))
+
+        # Add legend for the boxplots
+        ax_eff.legend(handles=[box_fwd_patch, box_rev_patch, orange_line], loc='upper left')
+        ax_eff.grid(False)
+
+        ax_ff.set_ylabel(plot_options["y_axis_labels"].get("Fill Factor"))
+        ax_ff.set_xticks(major_ticks)
+        ax_ff.set_xticklabels(pixel_labels, rotation=45, ha='right')
+
+        # Create proxy artists for the boxplot legend (Fill Factor)
+        box_fwd_patch_ff = mpatches.Patch(color=plot_options["forward_color"].get("Fill Factor", "blue"),
+                                          fill=False, label='Fwd')
+        box_rev_patch_ff = mpatches.Patch(color=plot_options["reverse_color"].get("Fill Factor", "red"),
+                                          fill=False, label='Rev')
+
+        for i in range(len(ff_fwd)):
+            # Create arrays with non-NaN values only for boxplots
+            ff_fwd_filtered = ff_fwd[i:i + 1]
+            ff_fwd_filtered = ff_fwd_filtered[~np.isnan(ff_fwd_filtered)]
+            ff_rev_filtered = ff_rev[i:i + 1]
+            ff_rev_filtered = ff_rev_filtered[~np.isnan(ff_rev_filtered)]
+
+            # Only create boxplot if there are valid values
+            if len(ff_fwd_filtered) > 0:
+                ax_ff.boxplot([ff_fwd_filtered], positions=[x_positions_fwd[i]], widths=0.1,
+                              patch_artist=True,
+                              boxprops=dict(facecolor='none',
+                                            color=plot_options["forward_color"].get("Fill Factor",
+                                                                                    "blue")),
+                              medianprops=dict(color='orange'))
+
+            if len(ff_rev_filtered) > 0:
+                ax_ff.boxplot([ff_rev_filtered], positions=[x_positions_rev[i]], widths=0.1,
+                              patch_artist=True,
+                              boxprops=dict(facecolor='none',
+                                            color=plot_options["reverse_color"].get("Fill Factor",
+                                                                                    "red")),
+                              medianprops=dict(color='orange'))
+
+        # Add legend for Fill Factor boxplots
+        ax_ff.legend(handles=[box_fwd_patch_ff, box_rev_patch_ff, orange_line], loc='upper left')
+        ax_ff.grid(True)
+    else:
+        x_positions = np.arange(1, num_pixels + 1)
+        pixel_labels = [f"Pixel {i}" for i in x_positions]
+        ax_jsc.set_ylabel(plot_options["y_axis_labels"]["Jsc"])
+        ax_jsc.set_xticks(x_positions)
+        ax_jsc.set_xticklabels([])  # No tick labels for Jsc
+        ax_jsc.scatter(x_positions, jsc_fwd, marker=plot_options["forward_marker"],
+                       s=ms * 10, color=plot_options["forward_color"]["Jsc"], label="Fwd")
+        ax_jsc.scatter(x_positions, jsc_rev, marker=plot_options["reverse_marker"],
+                       s=ms * 10, color=plot_options["reverse_color"]["Jsc"], label="Rev")
+        ax_jsc.legend()
+        ax_jsc.grid(True)
+
+        ax_voc.set_ylabel(plot_options["y_axis_labels"]["Voc"])
+        ax_voc.set_xticks(x_positions)
+        ax_voc.set_xticklabels([])  # No tick labels for Voc
+        ax_voc.scatter(x_positions, voc_fwd, marker=plot_options["forward_marker"],
+                       s=ms * 10, color=plot_options["forward_color"]["Voc"], label="Fwd")
+        ax_voc.scatter(x_positions, voc_rev, marker=plot_options["reverse_marker"],
+                       s=ms * 10, color=plot_options["reverse_color"]["Voc"], label="Rev")
+        ax_voc.legend()
+        ax_voc.grid(False)
+
+        ax_eff.set_ylabel(plot_options["y_axis_labels"]["Efficiency"])
+        ax_eff.set_xticks(x_positions)
+        ax_eff.set_xticklabels(pixel_labels, rotation=45, ha='right')
+        ax_eff.scatter(x_positions, eff_fwd, marker=plot_options["forward_marker"],
+                       s=ms * 10, color=plot_options["forward_color"]["Efficiency"], label="Fwd")
+        ax_eff.scatter(x_positions, eff_rev, marker=plot_options["reverse_marker"],
+                       s=ms * 10, color=plot_options["reverse_color"]["Efficiency"], label="Rev")
+        ax_eff.legend()
+        ax_eff.grid(False)
+
+        ax_ff.set_ylabel(plot_options["y_axis_labels"]["Fill Factor"])
+        ax_ff.set_xticks(x_positions)
+        ax_ff.set_xticklabels(pixel_labels, rotation=45, ha='right')
+        ax_ff.scatter(x_positions, ff_fwd, marker=plot_options["forward_marker"],
+                      s=ms * 10, color=plot_options["forward_color"]["Fill Factor"], label="Fwd")
+        ax_ff.scatter(x_positions, ff_rev, marker=plot_options["reverse_marker"],
+                      s=ms * 10, color=plot_options["reverse_color"]["Fill Factor"], label="Rev")
+        ax_ff.legend()
+        ax_ff.grid(False)
+
+    # I-V curves (Single File mode)
+    ax_iv.clear()
+    curves = store.iv_curves()
+    mine = store.file_curves(0)
+    if len(mine):
+        masks = store.voltage_masks(filter_options)
+        colors = ['blue', 'red', 'green', 'orange', 'purple', 'cyan', 'magenta', 'brown', 'pink', 'gray', 'olive',
+                  'teal']
+        # Current columns alternate Fwd, Rev per pixel
+        for i, curve in enumerate(mine, start=1):
+            axis = curves["axis"][curve]
+            mask = masks[axis]
+            voltage = curves["axes"][axis][mask]
+            y_data = curves["current"][curve][mask]
+            direction = "Fwd" if i % 2 == 1 else "Rev"
+            pixel_num = (i + 1) // 2
+            ax_iv.plot(voltage, y_data,
+                       linestyle=plot_options["iv_line_style"][direction],
+                       marker=plot_options["iv_marker"][direction],
+                       markersize=4, color=colors[(pixel_num - 1) % len(colors)],
+                       label=f"Pixel {pixel_num} ({direction})")
+        ax_iv.set_xlabel(plot_options["x_axis_labels"].get("IV", "Voltage [V]"))
+        ax_iv.set_ylabel(plot_options["y_axis_labels"].get("IV", "J [mA/cm²]"))
+        ax_iv.legend(loc='upper left')
+        ax_iv.grid(False)
+    else:
+        ax_iv.set_title("No I-V Data")
+
+    if "Hysteresis" in axes:
+        # Hysteresis index per pixel, from the PCE and from the I-V curve areas
+        ax_hi = axes["Hysteresis"]
+        ax_hi.clear()
+        hi = filtered["HI"][:num_columns:2]
+        hi_area = filtered["HI area"][:num_columns:2]
+        pixels = np.arange(1, len(hi) + 1)
+        ax_hi.scatter(pixels, hi, marker=plot_options["forward_marker"], s=ms * 10,
+                      color=plot_options["forward_color"].get("HI", "purple"), label="PCE")
+        ax_hi.scatter(pixels, hi_area, marker=plot_options["reverse_marker"], s=ms * 10,
+                      color=plot_options["forward_color"].get("HI area", "sienna"), label="I-V area")
+        ax_hi.axhline(0, color="gray", linewidth=0.8, linestyle="--")
+        ax_hi.set_xticks(pixels)
+        ax_hi.set_xticklabels([f"Pixel {i}" for i in pixels], rotation=45, ha='right')
+        ax_hi.set_ylabel(plot_options["y_axis_labels"].get("HI", "Hysteresis Index"))
+        ax_hi.legend()
+    fig.suptitle("Comparison Plot", fontsize=16, y=0.98)
+
+
+# Metric panels of the comparison plot: (axis key, default y label, x tick labels shown).
+# plot_options["panel_metrics"] decides which metric a panel shows.
+COMPARISON_PANELS = [("Jsc", r"$J_{sc}$ [mA/cm²]", False),
+                     ("Voc", r"$V_{oc}$ [V]", False),
+                     ("Efficiency", "Efficiency [%]", True),
+                     ("Fill Factor", "Fill Factor", True)]
+# Optional panel, drawn when the figure has a "Hysteresis" axis
+HYSTERESIS_PANEL = ("Hysteresis", "Hysteresis Index", True)
+
+
+def _comparison_groups(data, separate, per_pixel=False):
+    """Return [(direction, values)] for one file: (0, fwd) and (1, rev) when separated, else (None, all).
+
+    Metrics with one value per pixel (stored on both sweeps) give (None, one value per pixel).
+    """
+    if data is None or len(data) == 0:
+        return []
+    if per_pixel:
+        return [(None, data[::2])]
+    if not separate:
+        return [(None, data)]
+    if len(data) % 2 != 0:
+        data = data[:-1]
+    return [(0, data[::2]), (1, data[1::2])]
+
+
+def _draw_box_groups(ax, groups, width):
+    """Draw the boxplots, data points and median labels of all non-empty groups of one axis.
+
+    All boxes come from one boxplot call and all data points from one scatter
+    call. Each group gets its box artists; returns the shared point collection.
+    """
+    _draw_boxes(ax, groups, width)
+    offsets, colors = _point_arrays(groups)
+    return ax.scatter(offsets[:, 0], offsets[:, 1], s=20, color=colors, alpha=0.6)
+
+
+def _draw_boxes(ax, groups, width):
+    # Boxes and median labels of the non-empty groups, from one boxplot call
+    drawn = [g for g in groups if len(g["values"]) > 0]
+    if drawn:
+        bp = ax.boxplot([g["values"] for g in drawn], positions=[g["x"] for g in drawn], widths=width,
+                        patch_artist=True,
+                        boxprops=dict(facecolor='none', color='black'),
+                        medianprops=dict(color='orange'))
+    for k, group in enumerate(drawn):
+        med = np.nanmedian(group["values"])
+        group["artists"] = {"box": bp["boxes"][k], "median": bp["medians"][k],
+                            "whiskers": bp["whiskers"][2 * k:2 * k + 2], "caps": bp["caps"][2 * k:2 * k + 2],
+                            "fliers": bp["fliers"][k],
+                            "text": ax.text(group["x"] + 0.12, med, f"{med:.2f}", fontsize=10, color='orange',
+                                            ha="left", va="center")}
+
+
+def _point_arrays(groups):
+    """(x, y) offsets and colors of the data points of all groups of one axis."""
+    offsets = [np.column_stack([np.full(len(g["values"]), g["x"]), g["values"]]) for g in groups]
+    colors = [color for g in groups for color in [g["color"]] * len(g["values"])]
+    return (np.concatenate(offsets) if offsets else np.empty((0, 2))), colors
+
+
+def _update_box_group(group, values):
+    """Move the box artists of a group drawn by _draw_box_groups to new values (same geometry as boxplot)."""
+    artists, x, width = group["artists"], group["x"], group["width"]
+    visible = len(values) > 0
+    for artist in ([artists["box"], artists["median"], artists["fliers"], artists["text"]]
+                   + artists["whiskers"] + artists["caps"]):
+        artist.set_visible(visible)
+    group["values"] = values
+    if not visible:
+        return
+    stats = cbook.boxplot_stats(values)[0]
+    left, right = x - width * 0.5, x + width * 0.5
+    cap_left, cap_right = x - width * 0.25, x + width * 0.25
+    artists["box"].set_path(Path([(left, stats["q1"]), (right, stats["q1"]), (right, stats["q3"]),
+                                  (left, stats["q3"]), (left, stats["q1"])], closed=True))
+    artists["median"].set_data([left, right], [stats["med"], stats["med"]])
+    artists["whiskers"][0].set_data([x, x], [stats["q1"], stats["whislo"]])
+    artists["whiskers"][1].set_data([x, x], [stats["q3"], stats["whishi"]])
+    artists["caps"][0].set_data([cap_left, cap_right], [stats["whislo"], stats["whislo"]])
+    artists["caps"][1].set_data([cap_left, cap_right], [stats["whishi"], stats["whishi"]])
+    artists["fliers"].set_data(np.full(len(stats["fliers"]), x), stats["fliers"])
+    med = np.nanmedian(values)
+    artists["text"].set_position((x + 0.12, med))
+    artists["text"].set_text(f"{med:.2f}")
+
+
+IV_COLORS = ['blue', 'red', 'green', 'orange', 'purple', 'cyan', 'magenta', 'brown', 'pink', 'gray']
+# x offset of the Rev box from the Fwd box of a file
+REV_OFFSET = 0.2
+
+
+def _file_groups(per_file, files, separate, per_pixel, width, colors):
+    """Box groups of the given files of one axis; file i is drawn at x = i + 1."""
+    groups = []
+    for i in files:
+        for direction, values in _comparison_groups(per_file[i], separate, per_pixel):
+            # Filter NaN values for boxplots
+            values = values[~np.isnan(values)]
+            x = i + 1 + REV_OFFSET if direction == 1 else i + 1
+            groups.append({"file": i, "direction": direction, "x": x, "width": width,
+                           "color": colors[1 if direction == 1 else 0], "values": values, "artists": None})
+    return groups
+
+
+def _set_file_ticks(ax, labels, separate, show_labels):
+    # Ticks are shared by Fwd and Rev; labels only on the bottom row.
+    x_positions = np.arange(1, len(labels) + 1)
+    if separate and show_labels:
+        ax.set_xticks(x_positions + REV_OFFSET / 2)
+    else:
+        ax.set_xticks(x_positions)
+    if show_labels:
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+    else:
+        ax.set_xticklabels([])
+
+
+def _plot_iv_curve(ax_iv, state, i, curve, plot_options):
+    # The I-V curve(s) of file i; the lines are recorded in state["iv_lines"]
+    voltage, y_data, label = curve
+    if voltage is None or y_data is None:
+        return
+    color = IV_COLORS[i % len(IV_COLORS)]
+    if isinstance(y_data, tuple):  # Forward and reverse data
+        for direction, (name, y) in enumerate(zip(DIRECTIONS, y_data)):
+            if y is not None:
+                line, = ax_iv.plot(voltage, y,
+                                   linestyle=plot_options["iv_line_style"][name],
+                                   marker=plot_options["iv_marker"][name],
+                                   markersize=4, color=color,
+                                   label=f"{label} ({name})")
+                state["iv_lines"].append((line, i, direction))
+    else:  # Single dataset
+        line, = ax_iv.plot(voltage, y_data,
+                           linestyle=plot_options["iv_line_style"]["Fwd"],
+                           marker=plot_options["iv_marker"]["Fwd"],
+                           markersize=4, color=color,
+                           label=label)
+        state["iv_lines"].append((line, i, None))
+
+
+def plot_multiple(fig, axes, labels, prepared, plot_options, separate, title):
+    """Draw the comparison boxplots and I-V curves (prepared by susi_engine.prepare_multiple_plot_data).
+
+    Returns a plot state for update_multiple, which redraws the same plot for
+    new filter settings without rebuilding it, and for extend_multiple, which
+    adds files appended to the data.
+    """
+    ax_iv = axes["IV"]
+    iv_curves = prepared["iv_curves"]
+
+    # --- Clear Previous Plots ---
+    for ax in axes.values():
+        ax.clear()
+
+    panel_metrics = plot_options.get("panel_metrics", {})
+    panels = COMPARISON_PANELS + ([HYSTERESIS_PANEL] if "Hysteresis" in axes else [])
+    if "Hysteresis" in axes:
+        panel_metrics = {"Hysteresis": "HI", **panel_metrics}
+    state = {"fig": fig, "axes": axes, "labels": list(labels), "separate": separate, "title": title,
+             "panel_metrics": {panel: panel_metrics.get(panel, panel) for panel, _, _ in panels},
+             "groups": {}, "points": {}, "iv_lines": []}
+
+    # --- Plot Performance Metrics ---
+    for panel, default_ylabel, show_labels in panels:
+        ax = axes[panel]
+        metric = state["panel_metrics"][panel]
+        per_pixel = metric in PIXEL_METRICS
+        panel_separate = separate and not per_pixel
+        width = 0.1 if panel_separate else 0.2
+        colors = (plot_options["forward_color"].get(metric, "blue"), plot_options["reverse_color"].get(metric, "red"))
+        groups = _file_groups(prepared["metrics"][metric], range(len(labels)), separate, per_pixel, width, colors)
+        state["points"][panel] = _draw_box_groups(ax, groups, width)
+        state["groups"][panel] = groups
+        _set_file_ticks(ax, labels, panel_separate, show_labels)
+        ax.set_ylabel(plot_options["y_axis_labels"].get(metric, default_ylabel if metric == panel else metric))
+        ax.grid(False)  # Turn off grid
+
+    # --- Plot I-V curves ---
+    ax_iv.set_xlabel(plot_options["x_axis_labels"].get("IV", "Voltage [V]"))
+    ax_iv.set_ylabel(plot_options["y_axis_labels"].get("IV", "J [mA/cm²]"))
+
+    for i, curve in enumerate(iv_curves):
+        _plot_iv_curve(ax_iv, state, i, curve, plot_options)
+
+    ax_iv.legend(loc='upper left', fontsize=8)
+    ax_iv.grid(False)  # Turn off grid
+    # --- Overall Legend (top left, one row) ---
+    median_line = mlines.Line2D([], [], color='orange', linestyle='-', linewidth=2, label='Median')
+    box_patch = mpatches.Patch(facecolor='none', edgecolor='black', label='IQR Box')
+    data_marker = mlines.Line2D([], [], marker='o', color='black', linestyle='None', markersize=5,
+                                label='Data Points')
+    fig.legend(handles=[median_line, box_patch, data_marker],
+               loc='upper left', bbox_to_anchor=(0.01, 0.99), ncol=3, fontsize=10)
+    fig.suptitle(title, fontsize=16, y=0.98)
+    return state
+
+
+def update_multiple(state, prepared):
+    """Update a comparison plot drawn by plot_multiple to newly filtered data in place.
+
+    Only the groups whose values changed are touched. Returns False if the
+    plot cannot be updated in place (a group that was empty when drawn now
+    has data, or an axis lost all its data); the caller then has to redraw
+    it with plot_multiple.
+    """
+    axes = state["axes"]
+    for panel, metric in state["panel_metrics"].items():
+        changed = False
+        for group in state["groups"][panel]:
+            groups = dict(_comparison_groups(prepared["metrics"][metric][group["file"]], state["separate"],
+                                             metric in PIXEL_METRICS))
+            values = groups.get(group["direction"], np.empty(0))
+            values = values[~np.isnan(values)]
+            if np.array_equal(values, group["values"]):
+                continue
+            if group["artists"] is None:
+                return False
+            _update_box_group(group, values)
+            changed = True
+        if changed:
+            offsets, colors = _point_arrays(state["groups"][panel])
+            state["points"][panel].set_offsets(offsets)
+            state["points"][panel].set_color(colors)
+            if not any(len(group["values"]) for group in state["groups"][panel]):
+                return False  # nothing left to autoscale to; a redraw gives the empty-axis defaults
+            # x limits stay as boxplot set them (it pads the box positions by hand)
+            axes[panel].relim(visible_only=True)
+            axes[panel].autoscale_view(scalex=False)
+
+    iv_curves = prepared["iv_curves"]
+    for line, file_num, direction in state["iv_lines"]:
+        voltage, y_data, _ = iv_curves[file_num]
+        if voltage is None or y_data is None:
+            return False
+        y = y_data[direction] if direction is not None else y_data
+        if y is None:
+            return False
+        line.set_data(voltage, y)
+    if state["iv_lines"]:
+        axes["IV"].relim(visible_only=True)
+        axes["IV"].autoscale_view()
+    return True
+
+
+def extend_multiple(state, prepared, labels, plot_options):
+    """Add the files appended to the data since plot_multiple drew state, in place.
+
+    prepared covers all files, the drawn ones first; labels are the labels of
+    all files. Only the new boxes, points and I-V curves are drawn, and the
+    axes are rescaled as plot_multiple would scale them. Returns False if the
+    plot cannot be extended (files were removed); the caller then redraws it.
+    """
+    axes = state["axes"]
+    n_drawn = len(state["labels"])
+    if len(labels) < n_drawn:
+        return False
+    new_files = range(n_drawn, len(labels))
+    for panel, metric in state["panel_metrics"].items():
+        ax = axes[panel]
+        per_pixel = metric in PIXEL_METRICS
+        panel_separate = state["separate"] and not per_pixel
+        width = 0.1 if panel_separate else 0.2
+        colors = (plot_options["forward_color"].get(metric, "blue"), plot_options["reverse_color"].get(metric, "red"))
+        groups = _file_groups(prepared["metrics"][metric], new_files, state["separate"], per_pixel, width, colors)
+        _draw_boxes(ax, groups, width)
+        state["groups"][panel].extend(groups)
+        offsets, point_colors = _point_arrays(state["groups"][panel])
+        state["points"][panel].set_offsets(offsets)
+        state["points"][panel].set_color(point_colors)
+        show_labels = next(show for name, _, show in COMPARISON_PANELS + [HYSTERESIS_PANEL] if name == panel)
+        _set_file_ticks(ax, labels, panel_separate, show_labels)
+        drawn = [group["x"] for group in state["groups"][panel] if len(group["values"]) > 0]
+        if drawn:
+            # Same limits as one boxplot call over all boxes: y from the data, x padded by 0.5
+            ax.relim(visible_only=True)
+            ax.dataLim.intervalx = (min(drawn) - 0.5, max(drawn) + 0.5)
+            ax.autoscale_view()
+
+    ax_iv = axes["IV"]
+    for i in new_files:
+        _plot_iv_curve(ax_iv, state, i, prepared["iv_curves"][i], plot_options)
+    if state["iv_lines"]:
+        ax_iv.relim(visible_only=True)
+        ax_iv.autoscale_view()
+    ax_iv.legend(loc='upper left', fontsize=8)
+    state["labels"] = list(labels)
+    return True
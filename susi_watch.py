@@ -0,0 +1,62 @@
+"""
+SuSi Folder Watch
+-----------------
+Detects measurement files that appear or change in a directory, so the
+tool can pick up each new scan of the Sun Simulator as it is written.
+
+The directory is polled: one os.scandir per poll, comparing modification
+time and size with what was reported before, so nothing is read or parsed
+until a file is new or changed. This needs nothing outside the standard
+library and works the same on network shares, where change notifications
+are often not delivered.
+"""
+
+import fnmatch
+import os
+import time
+
+
+class FolderWatcher:
+    """Reports new or modified files in a directory on each poll().
+
+    A file is only reported once it has settled, i.e. its modification time
+    and size did not change since the previous poll or it was last written
+    more than settle_time seconds ago, so files the instrument is still
+    writing are not read half-finished. Files present when watching starts
+    are reported by the first poll.
+    """
+
+    def __init__(self, directory, pattern="*.txt", settle_time=2.0):
+        self.directory = directory
+        self.pattern = pattern
+        self.settle_time = settle_time
+        self._reported = {}  # path -> (mtime_ns, size) when reported
+        self._seen = {}  # path -> (mtime_ns, size) at the previous poll, not reported yet
+
+    def poll(self):
+        """Return the paths of files that are new or changed since the last poll, oldest first."""
+        now = time.time_ns()
+        current = {}
+        changed = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not fnmatch.fnmatch(entry.name, self.pattern) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                key = (stat.st_mtime_ns, stat.st_size)
+                current[entry.path] = key
+                if self._reported.get(entry.path) == key:
+                    continue
+                if self._seen.get(entry.path) == key or now - stat.st_mtime_ns > self.settle_time * 1e9:
+                    changed.append((stat.st_mtime_ns, entry.path))
+                    self._reported[entry.path] = key
+        self._seen = {path: key for path, key in current.items() if self._reported.get(path) != key}
+        # Forget deleted files, so they are reported again if they reappear
+        self._reported = {path: key for path, key in self._reported.items() if path in current}
+        return [path for _, path in sorted(changed)]
+
+    def forget(self, paths):
+        """Report paths again on a later poll, e.g. when loading them was cancelled."""
+        for path in paths:
+            self._reported.pop(path, None)
+            self._seen.pop(path, None)